@@ -0,0 +1,200 @@
+# Author: Alec Creasy
+# File Name: fakes.py
+# Description: Stand-ins for the Discord objects the cogs use (the bot, guilds, channels, members, messages, and
+# interactions), so the cogs' real handlers can be run without a connection to Discord. REST calls (sending messages,
+# fetching users) can be given a simulated latency.
+
+import asyncio
+from itertools import count
+from core.dispatcher import Dispatcher
+from core.metrics import Metrics
+from core.router import MessageRouter
+from core.scheduler import Scheduler
+from core.sharding import Partition
+from core.user_cache import UserCache
+
+_ids = count(100000000000000000)
+
+
+# Returns a new unique snowflake-like ID.
+def next_id():
+    return next(_ids)
+
+
+# Counts the simulated REST calls made through the fakes, by kind.
+class RestCounter:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+
+    async def call(self, kind):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeUser:
+    def __init__(self, name, guild=None, bot=False):
+        self.id = next_id()
+        self.name = name
+        self.guild = guild
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+
+    def __repr__(self):
+        return f"FakeUser({self.name!r})"
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content="", embed=None):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content=None, embed=None):
+        await self.channel.rest.call("edit_message")
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+        return self
+
+
+class FakeChannel:
+    def __init__(self, guild, name, rest):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.rest = rest
+        self.mention = f"<#{self.id}>"
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, embeds=None, **kwargs):
+        await self.rest.call("send_message")
+        self.sent += 1
+        return FakeMessage(self, self.guild.me if self.guild else None, content or "", embed)
+
+    async def create_thread(self, name, type=None, auto_archive_duration=None, **kwargs):
+        await self.rest.call("create_thread")
+        thread = FakeThread(self, name)
+        self.guild.threads[thread.id] = thread
+        return thread
+
+
+class FakeThread(FakeChannel):
+    def __init__(self, parent, name):
+        super().__init__(parent.guild, name, parent.rest)
+        self.parent = parent
+
+
+class FakeGuild:
+    def __init__(self, name, rest, channel_names=("general", "welcome", "wordle")):
+        self.id = next_id()
+        self.name = name
+        self.me = None
+        self.members = []
+        self.text_channels = [FakeChannel(self, channel_name, rest) for channel_name in channel_names]
+        self.threads = {}
+
+    @property
+    def channels(self):
+        return self.text_channels
+
+    def get_channel(self, channel_id):
+        return next((channel for channel in self.text_channels if channel.id == channel_id), self.threads.get(channel_id))
+
+    def channel(self, name):
+        return next(channel for channel in self.text_channels if channel.name == name)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    async def send_message(self, content=None, embed=None, ephemeral=False, **kwargs):
+        await self.interaction.rest.call("interaction_response")
+        self.done = True
+
+    async def defer(self, ephemeral=False, thinking=False):
+        await self.interaction.rest.call("interaction_response")
+        self.done = True
+
+    def is_done(self):
+        return self.done
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, embed=None, ephemeral=False, **kwargs):
+        await self.interaction.rest.call("followup_message")
+
+
+class FakeInteraction:
+    def __init__(self, user, channel, rest):
+        self.id = next_id()
+        self.user = user
+        self.channel = channel
+        self.guild = channel.guild
+        self.rest = rest
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+# A stand-in for the bot with the shared services attached the same way bot.py attaches them. Users known to the bot
+# are returned by get_user (the gateway cache); every other user is "fetched" with a simulated REST call.
+class FakeBot:
+    def __init__(self, rest):
+        self.rest = rest
+        self.user = FakeUser("SmiteNightBot", bot=True)
+        self.latency = 0.05
+        self.cogs = {}
+        self.guilds = []
+        self.known_users = {}
+        self.channels = {}
+        self.metrics = Metrics()
+        self.user_cache = UserCache(self)
+        self.router = MessageRouter(self.metrics)
+        self.scheduler = Scheduler()
+        self.dispatcher = Dispatcher()
+        self.partition = Partition()
+
+    def add_guild(self, guild):
+        guild.me = self.user
+        self.guilds.append(guild)
+        for channel in guild.text_channels:
+            self.channels[channel.id] = channel
+
+    async def wait_until_ready(self):
+        pass
+
+    def is_ready(self):
+        return True
+
+    def get_channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = next((guild.threads[channel_id] for guild in self.guilds if channel_id in guild.threads), None)
+        return channel
+
+    def get_user(self, user_id):
+        return self.known_users.get(user_id)
+
+    async def fetch_user(self, user_id):
+        await self.rest.call("fetch_user")
+        return FakeUser(f"user-{user_id}")
+
+    async def add_cog(self, cog):
+        self.cogs[type(cog).__name__] = cog
+        await cog.cog_load()
+
+    async def remove_cogs(self):
+        for cog in self.cogs.values():
+            await cog.cog_unload()
+        self.cogs.clear()
+        self.scheduler.stop()
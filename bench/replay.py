@@ -0,0 +1,319 @@
+# Author: Alec Creasy
+# File Name: replay.py
+# Description: Offline load test for the cogs. Builds the real Wordle, Quotes, Events, and Utility cogs against the fake
+# bot from fakes.py, replays synthetic traffic through their handlers (Wordle games and guess bursts, /addquote storms,
+# /quote lookups, member join waves, and background chatter), and reports the handler latency percentiles, event loop
+# lag, and (with --allocations) the memory each scenario grew by, per event.
+#
+# Run it from the directory of the repository:
+#   python -m bench.replay --guilds 50 --games 20 --guesses 2000 --quotes 2000 --joins 500
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from configparser import ConfigParser
+from time import perf_counter
+
+from bench.fakes import FakeBot, FakeGuild, FakeInteraction, FakeMessage, FakeUser, RestCounter
+from cogs.events import Events
+from cogs.quotes import Quotes
+from cogs.utility import Utility
+from cogs.wordle import Wordle
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings that point at files the cogs write to. These are redirected into a temporary directory so that a benchmark
+# run never touches the real data.
+WRITABLE_SETTINGS = {
+    ("Quotes", "QUOTES_FILE"): "quotes.json",
+    ("Quotes", "QUOTES_DB"): "quotes.db",
+    ("Quotes", "INDEX_FILE"): "quotes.index",
+    ("Wordle", "LEADERBOARD_DB"): "wordle.db",
+    ("Wordle", "GAMES_DB"): "games.db",
+    ("Bot", "COMMAND_HASH_FILE"): "commands.hash",
+}
+
+
+# Writes a copy of config.ini into the given directory, with relative paths made absolute (so the word lists and
+# caches in the repository are still used) and the writable files moved into the directory, and switches into it.
+def prepare_config(directory, overrides):
+    config = ConfigParser()
+    config.optionxform = str  # Keep the setting names in capitals, like the original file.
+    config.read(os.path.join(REPO_DIR, "config.ini"))
+
+    for section in config.sections():
+        for key, value in config.items(section):
+            if value.startswith("./"):
+                config.set(section, key, os.path.join(REPO_DIR, value[2:]))
+    for (section, key), file_name in WRITABLE_SETTINGS.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, key, os.path.join(directory, file_name))
+    for (section, key), value in overrides.items():
+        config.set(section, key, str(value))
+
+    with open(os.path.join(directory, "config.ini"), "w") as file:
+        config.write(file)
+    os.chdir(directory)
+
+
+# Collects the latency of every handler call for one scenario, along with how much the traced memory grew while it ran.
+# tracemalloc only sees memory that is still held, so these are the peak growth and the growth left at the end (memory
+# the scenario kept), not the total allocated: a burst that frees what it allocates barely shows up.
+class Scenario:
+    # gap is how long (in seconds) to wait between bursts, so that delayed work (board edits, batched writes, queued
+    # messages) gets to run during the scenario like it would between real events.
+    def __init__(self, name, track_allocations, gap=0.0):
+        self.name = name
+        self.track_allocations = track_allocations
+        self.gap = gap
+        self.latencies = []
+        self.peak_growth = 0
+        self.kept = 0
+
+    # Runs a handler coroutine and records how long it took.
+    async def measure(self, coroutine):
+        start = perf_counter()
+        await coroutine
+        self.latencies.append(perf_counter() - start)
+
+    # Runs the given coroutines concurrently (as a burst of events arriving together).
+    async def burst(self, coroutines):
+        await asyncio.gather(*(self.measure(coroutine) for coroutine in coroutines))
+        if self.gap:
+            await asyncio.sleep(self.gap)
+
+    def __enter__(self):
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak_growth = peak - self.start_memory
+            self.kept = current - self.start_memory
+
+
+# Samples how late the event loop wakes up from a short sleep. A handler that blocks the loop shows up as lag.
+class LagMonitor:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self.task.cancel()
+        return self.samples
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(scenario, lag_samples, rest):
+    events = len(scenario.latencies)
+    line = (f"{scenario.name:<14} {events:>7} events  p50 {percentile(scenario.latencies, 0.50) * 1000:8.3f}ms  "
+            f"p99 {percentile(scenario.latencies, 0.99) * 1000:8.3f}ms  "
+            f"loop lag p99 {percentile(lag_samples, 0.99) * 1000:7.3f}ms max {max(lag_samples, default=0) * 1000:7.3f}ms")
+    if scenario.track_allocations and events:
+        line += f"  peak {scenario.peak_growth / events:8.0f} B/event  kept {scenario.kept / events:8.0f} B/event"
+    print(line)
+    if rest.calls:
+        print(" " * 15 + ", ".join(f"{kind}: {calls}" for kind, calls in sorted(rest.calls.items())))
+    rest.calls.clear()
+
+
+async def run(args):
+    rest = RestCounter(args.rest_latency / 1000)
+    bot = FakeBot(rest)
+    random.seed(args.seed)
+
+    # Create the servers, each with a few members. Half of the members are in the bot's gateway cache.
+    guilds = []
+    for i in range(args.guilds):
+        guild = FakeGuild(f"guild-{i}", rest)
+        guild.members = [FakeUser(f"member-{i}-{j}", guild) for j in range(args.members)]
+        for member in guild.members[::2]:
+            bot.known_users[member.id] = member
+        bot.add_guild(guild)
+        guilds.append(guild)
+
+    cogs = [Events(bot), Utility(bot), Quotes(bot), Wordle(bot)]
+    for cog in cogs:
+        await bot.add_cog(cog)
+    events, utility, quotes, wordle = cogs
+
+    if args.allocations:
+        tracemalloc.start()
+    monitor = LagMonitor()
+    print(f"{args.guilds} guilds, {args.members} members each, simulated REST latency {args.rest_latency}ms\n")
+
+    # Start Wordle games, spread over the servers' #wordle channels. Each game gets its own thread, so servers can have
+    # several games running at once.
+    wordle_channels = [guilds[i % len(guilds)].channel("wordle") for i in range(args.games)]
+    monitor.start()
+    with Scenario("/wordle", args.allocations, args.gap / 1000) as scenario:
+        await scenario.burst(wordle.wordle.callback(wordle, FakeInteraction(random.choice(channel.guild.members), channel, rest))
+                             for channel in wordle_channels)
+    report(scenario, monitor.stop(), rest)
+    game_channels = [bot.get_channel(channel_id) for channel_id in wordle.games]
+
+    # Send bursts of guesses into the running games: mostly valid words, with some invalid words and repeats mixed
+    # in. Chatter in the other channels goes through the router too, like it would with a real connection.
+    guesses = wordle.variant(wordle.DEFAULT_LENGTH).index.guesses
+    monitor.start()
+    with Scenario("guesses", args.allocations, args.gap / 1000) as scenario:
+        for start in range(0, args.guesses, args.burst):
+            messages = []
+            for _ in range(min(args.burst, args.guesses - start)):
+                channel = random.choice(game_channels)
+                roll = random.random()
+                if roll < 0.1:
+                    content = "qzxvk"
+                elif roll < 0.2:
+                    content = "hello there"
+                else:
+                    content = random.choice(guesses)
+                messages.append(FakeMessage(channel, random.choice(channel.guild.members), content))
+            await scenario.burst(bot.router.dispatch(message) for message in messages)
+    report(scenario, monitor.stop(), rest)
+
+    # Ask for a hint in every game that is still running. The search runs in a separate process, so this mostly shows
+    # how long users wait for a hint while the event loop keeps going.
+    running = [channel for channel in game_channels if channel.id in wordle.games]
+    monitor.start()
+    with Scenario("/hint", args.allocations, args.gap / 1000) as scenario:
+        await scenario.burst(wordle.hint.callback(wordle, FakeInteraction(random.choice(channel.guild.members), channel, rest))
+                             for channel in running)
+    report(scenario, monitor.stop(), rest)
+
+    monitor.start()
+    with Scenario("chatter", args.allocations, args.gap / 1000) as scenario:
+        for start in range(0, args.chatter, args.burst):
+            messages = [FakeMessage(guild.channel("general"), random.choice(guild.members), "just chatting")
+                        for guild in random.choices(guilds, k=min(args.burst, args.chatter - start))]
+            await scenario.burst(bot.router.dispatch(message) for message in messages)
+    report(scenario, monitor.stop(), rest)
+
+    # Storm /addquote, then look quotes up (randomly, by author, and through author autocomplete).
+    authors = [f"Author {i}" for i in range(max(1, args.quotes // 20))]
+    monitor.start()
+    with Scenario("/addquote", args.allocations, args.gap / 1000) as scenario:
+        for start in range(0, args.quotes, args.burst):
+            interactions = []
+            for _ in range(min(args.burst, args.quotes - start)):
+                guild = random.choice(guilds)
+                interactions.append((FakeInteraction(random.choice(guild.members), guild.channel("general"), rest),
+                                     f"quote number {random.random()}", random.choice(authors)))
+            await scenario.burst(quotes.add_quote.callback(quotes, interaction, text, author)
+                                 for interaction, text, author in interactions)
+    report(scenario, monitor.stop(), rest)
+
+    monitor.start()
+    with Scenario("/quote", args.allocations, args.gap / 1000) as scenario:
+        for start in range(0, args.lookups, args.burst):
+            interactions = []
+            for _ in range(min(args.burst, args.lookups - start)):
+                guild = random.choice(guilds)
+                interactions.append(FakeInteraction(random.choice(guild.members), guild.channel("general"), rest))
+            await scenario.burst(quotes.quote.callback(quotes, interaction, random.choice([None] + authors))
+                                 for interaction in interactions)
+    report(scenario, monitor.stop(), rest)
+
+    monitor.start()
+    with Scenario("/quotesearch", args.allocations, args.gap / 1000) as scenario:
+        for start in range(0, args.lookups, args.burst):
+            interactions = []
+            for _ in range(min(args.burst, args.lookups - start)):
+                guild = random.choice(guilds)
+                interactions.append(FakeInteraction(random.choice(guild.members), guild.channel("general"), rest))
+            await scenario.burst(quotes.quote_search.callback(quotes, interaction, random.choice(["quote", "number", "quote number 0.5"]),
+                                                              random.randint(1, 3))
+                                 for interaction in interactions)
+    report(scenario, monitor.stop(), rest)
+
+    monitor.start()
+    with Scenario("autocomplete", args.allocations, args.gap / 1000) as scenario:
+        guild = guilds[0]
+        for start in range(0, args.lookups, args.burst):
+            interaction = FakeInteraction(guild.members[0], guild.channel("general"), rest)
+            await scenario.burst(quotes.author_autocomplete(interaction, random.choice(authors)[:random.randint(0, 8)])
+                                 for _ in range(min(args.burst, args.lookups - start)))
+    report(scenario, monitor.stop(), rest)
+
+    # A wave of new members joining the servers.
+    monitor.start()
+    with Scenario("member joins", args.allocations, args.gap / 1000) as scenario:
+        for start in range(0, args.joins, args.burst):
+            await scenario.burst(events.on_member_join(FakeUser("newcomer", random.choice(guilds)))
+                                 for _ in range(min(args.burst, args.joins - start)))
+    report(scenario, monitor.stop(), rest)
+
+    monitor.start()
+    with Scenario("/ping /help", args.allocations, args.gap / 1000) as scenario:
+        guild = guilds[0]
+        await scenario.burst(command.callback(utility, FakeInteraction(guild.members[0], guild.channel("general"), rest))
+                             for command in [utility.ping, utility.help] * (args.burst // 2 or 1))
+    report(scenario, monitor.stop(), rest)
+
+    print(f"\nUser cache: {bot.user_cache.stats()}")
+    print(f"Dispatcher: {bot.dispatcher.stats()}")
+    print("\nSlowest handlers (from the bot's metrics):")
+    for kind, name, calls, mean, p50, p99 in bot.metrics.summary()[:5]:
+        print(f"  {kind} {name}: {calls} calls, mean {mean * 1000:.3f}ms, p99 <= {p99 * 1000:.1f}ms")
+    if args.allocations:
+        tracemalloc.stop()
+    await bot.remove_cogs()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replays synthetic traffic through the cogs and reports latency.")
+    parser.add_argument("--guilds", type=int, default=50, help="number of servers")
+    parser.add_argument("--members", type=int, default=40, help="members per server")
+    parser.add_argument("--games", type=int, default=20, help="concurrent Wordle games")
+    parser.add_argument("--guesses", type=int, default=2000, help="Wordle guesses to send")
+    parser.add_argument("--chatter", type=int, default=5000, help="messages sent in channels without a game")
+    parser.add_argument("--quotes", type=int, default=2000, help="/addquote calls")
+    parser.add_argument("--lookups", type=int, default=2000, help="/quote calls (and autocomplete requests)")
+    parser.add_argument("--joins", type=int, default=500, help="members joining")
+    parser.add_argument("--burst", type=int, default=50, help="events sent concurrently in each burst")
+    parser.add_argument("--gap", type=float, default=10.0, help="milliseconds to wait between bursts")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="simulated REST latency in milliseconds")
+    parser.add_argument("--allocations", action="store_true", help="track the peak and kept memory growth per event (slower)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the generated traffic")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="smitenight-bench-")
+    try:
+        # Keep the timers and write delays short so that the run is not dominated by waiting.
+        prepare_config(directory, {("Wordle", "BOARD_DELAY"): 0.05, ("Quotes", "FLUSH_DELAY"): 0.05,
+                                   ("Welcome", "BATCH_WINDOW"): 0.05})
+        asyncio.run(run(args))
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,37 +9,194 @@ import discord.ext.commands as commands
 import dotenv
 from typing import Final
 import os
+import asyncio
+import hashlib
+import json
+import multiprocessing
+from time import perf_counter
+from configparser import ConfigParser
+from core.user_cache import UserCache
+from core.router import MessageRouter
+from core.scheduler import Scheduler
+from core.metrics import Metrics
+from core.dispatcher import Dispatcher
+from core.sharding import Partition, recommended_shards, split
+
+# Note the start time so that the startup timing report can show how long the bot took to come online.
+START_TIME: Final[float] = perf_counter()
 
 # Load environment with token and store it in a constant.
 dotenv.load_dotenv()
 TOKEN: Final[str] = os.getenv("TOKEN")
 
+# Read the bot settings from the config.ini file. The command hash file stores a hash of the commands that were last
+# synced with Discord, so that the commands are only synced again when they change.
+config = ConfigParser()
+config.read("./config.ini")
+COMMAND_HASH_FILE: Final[str] = config.get("Bot", "COMMAND_HASH_FILE", fallback="./data/commands.hash")
+
+# The local port to serve metrics on in the Prometheus text format (0 turns the endpoint off).
+METRICS_PORT: Final[int] = int(config.get("Bot", "METRICS_PORT", fallback=0))
+
+# The number of worker processes to run the bot in, and the total number of shards to split between them (0 uses the
+# number Discord recommends). With a single worker and SHARD_COUNT = 0, the bot runs unsharded in one process.
+WORKERS: Final[int] = int(config.get("Bot", "WORKERS", fallback=1))
+SHARD_COUNT: Final[int] = int(config.get("Bot", "SHARD_COUNT", fallback=0))
+
+# Discord only allows one shard to identify (connect) every 5 seconds, so the workers take turns.
+IDENTIFY_DELAY: Final[float] = 5.0
+
+# The cogs to load when the bot starts.
+EXTENSIONS: Final[tuple] = ("cogs.events", "cogs.utility", "cogs.quotes", "cogs.misc", "cogs.wordle")
+
 # Set intents, as well as enable the members intent.
 # We need these enabled to detect new users.
 intents = Intents.default()
 intents.members = True
 intents.message_content = True
 
-# Initialize the bot for slash commands.
-bot = commands.Bot(command_prefix='/', intents=intents)
+# Creates the bot for the given worker process. shard_ids are the shards this worker connects (out of shard_count in
+# total), and identify_lock is shared by the workers so that only one shard identifies at a time. Without a shard count,
+# an unsharded bot is created.
+def create_bot(worker=0, shard_ids=None, shard_count=None, identify_lock=None):
+    # Initialize the bot for slash commands, with the activity set to "/help if ya need something". The activity is
+    # sent when the bot connects (and again on every reconnect).
+    if shard_count:
+        bot = commands.AutoShardedBot(command_prefix='/', intents=intents, activity=Game("/help if ya need something"),
+                                      shard_ids=shard_ids, shard_count=shard_count)
+    else:
+        bot = commands.Bot(command_prefix='/', intents=intents, activity=Game("/help if ya need something"))
+
+    # The servers this worker is responsible for. The cogs only load and save the per-server state of these servers.
+    bot.worker = worker
+    bot.partition = Partition(shard_ids, shard_count) if shard_ids is not None else Partition()
+
+    # Shared metrics. Times every command, listener, and REST request, counts rate limits, and samples event loop lag.
+    bot.metrics = Metrics()
+    bot.metrics.install(bot)
+
+    # Shared cache used by the cogs to resolve user IDs without a REST call each time.
+    bot.user_cache = UserCache(bot)
+
+    # Shared message router. Cogs register the channels they want messages from (for example, channels with a game
+    # running), and messages from every other channel are dropped before any cog sees them.
+    bot.router = MessageRouter(bot.metrics)
+    bot.add_listener(bot.router.dispatch, "on_message")
+
+    # Shared outbound message queue. Messages to the same channel are prioritized, paced to the channel's rate limit,
+    # and merged where possible.
+    bot.dispatcher = Dispatcher()
+
+    # Shared scheduler used by the cogs for timed events (game timeouts, reminders, and the weekly leaderboard reset).
+    bot.scheduler = Scheduler()
+
+    # Waits for this worker's turn to identify a shard. The lock is held for IDENTIFY_DELAY seconds after each identify
+    # so that the next one (from any worker) waits long enough.
+    if identify_lock is not None:
+        async def before_identify_hook(shard_id, *, initial=False):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, identify_lock.acquire)
+            loop.call_later(IDENTIFY_DELAY, identify_lock.release)
+        bot.before_identify_hook = before_identify_hook
 
-# Triggers when the bot is ready. Prints to the console that the user is online, syncs the commands, and sets the
-# activity to "/help if ya need something".
-@bot.event
-async def on_ready():
-    print(f"SmiteNightBot is now online as {bot.user}")
+    # Runs once when the bot logs in, before it connects to the gateway (unlike on_ready, which runs again on every
+    # reconnect). Loads the cogs concurrently, syncs the commands if they changed (only the first worker syncs, since
+    # the commands are the same for every worker), and prints how long each step took.
+    @bot.event
+    async def setup_hook():
+        bot.startup_timings = {"login": perf_counter() - START_TIME}
 
-    activity = Game("/help if ya need something")
-    await bot.change_presence(activity=activity)
+        bot.metrics.start_lag_monitor()
+        if METRICS_PORT:
+            await bot.metrics.start_server(METRICS_PORT + worker)
+            print(f"Serving metrics on http://127.0.0.1:{METRICS_PORT + worker}/metrics")
 
-    await bot.load_extension("cogs.events")
-    await bot.load_extension("cogs.utility")
-    await bot.load_extension("cogs.quotes")
-    await bot.load_extension("cogs.misc")
-    await bot.load_extension("cogs.wordle")
-    print("COGS Loaded!")
+        start = perf_counter()
+        extension_timings = await asyncio.gather(*(load_extension(bot, name) for name in EXTENSIONS))
+        bot.startup_timings["cogs"] = perf_counter() - start
+        for name, elapsed in zip(EXTENSIONS, extension_timings):
+            bot.startup_timings[name] = elapsed
+        print("COGS Loaded!")
+
+        if worker == 0:
+            start = perf_counter()
+            synced = await sync_commands(bot)
+            bot.startup_timings["sync"] = perf_counter() - start
+            print("Commands synced!" if synced else "Commands unchanged, skipped sync.")
+
+    # Triggers when the bot is ready. Prints to the console that the user is online. This runs again every time the bot
+    # reconnects, so the startup timing report is only printed the first time.
+    @bot.event
+    async def on_ready():
+        if shard_ids is not None:
+            print(f"SmiteNightBot worker {worker} (shards {', '.join(map(str, shard_ids))} of {shard_count}) is now online as {bot.user}")
+        else:
+            print(f"SmiteNightBot is now online as {bot.user}")
+
+        if "ready" not in bot.startup_timings:
+            bot.startup_timings["ready"] = perf_counter() - START_TIME
+            print("Startup timings:")
+            for phase, elapsed in bot.startup_timings.items():
+                print(f"  {phase}: {elapsed * 1000:.0f}ms")
+
+    return bot
+
+# Returns a hash of the app commands as they would be sent to Discord when syncing, along with the application ID (so a
+# different bot token always syncs).
+def command_tree_hash(bot):
+    commands_payload = sorted((command.to_dict(bot.tree) for command in bot.tree.get_commands()), key=lambda command: command["name"])
+    serialized = json.dumps([bot.application_id, commands_payload], sort_keys=True)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+# Syncs the app commands with Discord, but only if they changed since the last sync. Syncing is a heavily rate-limited
+# call, so it is skipped when the stored hash matches the current commands. Returns whether the commands were synced.
+async def sync_commands(bot):
+    tree_hash = command_tree_hash(bot)
+    if os.path.exists(COMMAND_HASH_FILE):
+        with open(COMMAND_HASH_FILE) as file:
+            if file.read().strip() == tree_hash:
+                return False
 
     await bot.tree.sync()
-    print("Commands synced!")
 
-bot.run(token=TOKEN)
\ No newline at end of file
+    os.makedirs(os.path.dirname(COMMAND_HASH_FILE) or ".", exist_ok=True)
+    with open(COMMAND_HASH_FILE, "w") as file:
+        file.write(tree_hash)
+    return True
+
+# Loads a cog and returns how long it took, in seconds.
+async def load_extension(bot, name):
+    start = perf_counter()
+    await bot.load_extension(name)
+    return perf_counter() - start
+
+# Runs a worker process: creates its bot and connects its shards.
+def run_worker(worker, shard_ids, shard_count, identify_lock):
+    create_bot(worker, shard_ids, shard_count, identify_lock).run(token=TOKEN)
+
+# Starts the bot. With more than one worker, the shards are split between that many worker processes (started fresh,
+# rather than forked, so that no state is shared by accident), and this process waits for them to exit.
+def main():
+    if WORKERS <= 1:
+        create_bot(shard_count=SHARD_COUNT or None).run(token=TOKEN)
+        return
+
+    shard_count = SHARD_COUNT or asyncio.run(recommended_shards(TOKEN))
+    context = multiprocessing.get_context("spawn")
+    identify_lock = context.Lock()
+    workers = [context.Process(target=run_worker, args=(worker, shard_ids, shard_count, identify_lock), name=f"SmiteNightBot-{worker}")
+               for worker, shard_ids in enumerate(split(shard_count, WORKERS))]
+    print(f"Starting {len(workers)} workers for {shard_count} shards")
+
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        # The workers get the interrupt too and shut down on their own.
+        for process in workers:
+            process.join()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
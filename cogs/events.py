@@ -2,21 +2,125 @@
 # File Name: events.py
 # Description: Creates a Cog to listen for events, in particular, when a member joins the server.
 
+import discord
 from discord import utils
 from discord.ext import commands
+from configparser import ConfigParser
 
+# Discord allows up to 2000 characters in a message.
+MESSAGE_LIMIT = 2000
+
+# Creates the Events class to be used as a Cog. There will also be a ConfigParser that will be responsible for parsing
+# data from the config.ini file. The welcome channel can be set for each server in a [Welcome <server ID>] section of
+# config.ini, either by CHANNEL_ID or CHANNEL_NAME, and falls back to the CHANNEL_NAME in the [Welcome] section.
 class Events(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.config = ConfigParser()
+        self.config.read("./config.ini")
+        self.CHANNEL_NAME = self.config.get("Welcome", "CHANNEL_NAME", fallback="welcome")
+        self.BATCH_WINDOW = float(self.config.get("Welcome", "BATCH_WINDOW", fallback=2.0))
+        self.channel_ids = {}  # Guild ID -> the ID of its welcome channel, or None if it does not have one.
+        self.pending = {}  # Guild ID -> the members waiting to be welcomed, in the order they joined.
+        self.timers = {}  # Guild ID -> the timer that sends the guild's pending welcome.
+
+    # Runs when the Cog is unloaded. Welcomes everyone who is still waiting instead of dropping them.
+    async def cog_unload(self):
+        for timer in self.timers.values():
+            timer.cancel()
+        for guild_id in list(self.pending):
+            await self.send_welcome(guild_id)
 
-    # Triggers when a member joins the server. Gets the welcome channel (if it exists), and sends a welcome
-    # message to the welcome channel mentioning the user. In the API, servers are referenced as guilds.
+    # Triggers when a member joins the server. Queues the member to be welcomed, timing how long it takes. Members who
+    # join within BATCH_WINDOW seconds of the first one are welcomed together in a single message, so that a wave of
+    # joins (or a raid) does not send a message per member. In the API, servers are referenced as guilds.
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        welcome_channel = utils.get(member.guild.channels, name='welcome')
-        if welcome_channel:
-            await welcome_channel.send(f"Everyone give a HUGE welcome to this new pal: {member.mention}!")
+        async with self.bot.metrics.timed("listener", "Events.on_member_join"):
+            self.welcome(member)
+
+    # Triggers when a member leaves the server. If they have not been welcomed yet, they are taken out of the queue.
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        pending = self.pending.get(member.guild.id)
+        if pending and member in pending:
+            pending.remove(member)
+
+    # The welcome channel is looked up once per server and cached, so the cached channel is forgotten whenever one of
+    # the server's channels is created, changed (such as being renamed), or deleted.
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.channel_ids.pop(channel.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.channel_ids.pop(after.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.channel_ids.pop(channel.guild.id, None)
+
+    # Adds the member to their server's pending welcome, and schedules the welcome to be sent if it is the first member
+    # waiting.
+    def welcome(self, member):
+        guild_id = member.guild.id
+        pending = self.pending.setdefault(guild_id, [])
+        pending.append(member)
+        if guild_id not in self.timers:
+            self.timers[guild_id] = self.bot.scheduler.call_later(self.BATCH_WINDOW, self.send_welcome, guild_id)
+
+    # Returns the server's welcome channel (if it exists), using the cached channel ID when there is one.
+    def welcome_channel(self, guild):
+        if guild.id in self.channel_ids:
+            channel_id = self.channel_ids[guild.id]
+            return guild.get_channel(channel_id) if channel_id else None
+
+        section = f"Welcome {guild.id}"
+        channel_id = self.config.get(section, "CHANNEL_ID", fallback=None)
+        if channel_id:
+            channel = guild.get_channel(int(channel_id))
+        else:
+            channel = utils.get(guild.text_channels, name=self.config.get(section, "CHANNEL_NAME", fallback=self.CHANNEL_NAME))
+
+        self.channel_ids[guild.id] = channel.id if channel else None
+        return channel
+
+    # Sends the welcome message for everyone waiting in the server to the welcome channel (if it exists), mentioning
+    # each new member. If there are too many members to mention in one message, it is split into several.
+    async def send_welcome(self, guild_id):
+        self.timers.pop(guild_id, None)
+        members = self.pending.pop(guild_id, [])
+        if not members:
+            return
+
+        welcome_channel = self.welcome_channel(members[0].guild)
+        if not welcome_channel:
+            return
+
+        for message in self.welcome_messages([member.mention for member in members]):
+            try:
+                await welcome_channel.send(message)
+            except discord.HTTPException as error:
+                print(f"Failed to send welcome message: {error}")
+                return
+
+    # Builds the welcome messages for the mentions, fitting as many as possible into each message.
+    @staticmethod
+    def welcome_messages(mentions):
+        if len(mentions) == 1:
+            return [f"Everyone give a HUGE welcome to this new pal: {mentions[0]}!"]
+
+        messages = []
+        start = "Everyone give a HUGE welcome to these new pals: "
+        message = start
+        for mention in mentions:
+            if message != start and len(message) + len(mention) + 3 > MESSAGE_LIMIT:
+                messages.append(message[:-2] + "!")
+                message = start
+            message += f"{mention}, "
+        messages.append(message[:-2] + "!")
+        return messages
 
 # Setups Cog to listen for on_member_join event.
 async def setup(bot):
-    await bot.add_cog(Events(bot))
\ No newline at end of file
+    await bot.add_cog(Events(bot))
@@ -5,10 +5,21 @@
 
 from discord import app_commands
 from discord.ext import commands
-import os
-import json
 import random
+import asyncio
 from configparser import ConfigParser
+from core import stores
+from core.author_index import AuthorIndex
+from core.quote_index import QuoteIndex
+
+# Discord allows up to 2000 characters in a message. Each page of /quotesearch results leaves FOOTER_ROOM characters of
+# that for the page count.
+MESSAGE_LIMIT = 2000
+FOOTER_ROOM = 64
+
+# Shortens the text to at most limit characters, ending it with "..." if it was cut.
+def shorten(text, limit):
+    return text if len(text) <= limit else text[:max(limit - 3, 0)] + "..."
 
 #Create a Quotes class to be used as a Cog. There will also be a ConfigParser that will be responsible for parsing data
 # from the config.ini file.
@@ -17,24 +28,62 @@ class Quotes(commands.Cog):
         self.bot = bot
         self.config = ConfigParser()
         self.config.read("./config.ini")
-        self.quotes = [] # Create an empty list for the list of quotes.
         self.QUOTES_FILE = self.config.get("Quotes", "QUOTES_FILE", fallback=None)
+        self.QUOTES_DB = self.config.get("Quotes", "QUOTES_DB", fallback="./data/quotes.db")
+        self.FLUSH_DELAY = float(self.config.get("Quotes", "FLUSH_DELAY", fallback=0.5))
+        self.INDEX_FILE = self.config.get("Quotes", "INDEX_FILE", fallback=None)
+        self.PAGE_SIZE = int(self.config.get("Quotes", "PAGE_SIZE", fallback=5))
+        self.STORE_BACKEND = self.config.get("Bot", "STORE_BACKEND", fallback="sqlite")
+
+        # Open the quote store (the backend set by STORE_BACKEND) and read in the saved quotes. If the database is new and
+        # a quotes.json file exists, the quotes from the JSON file are imported into the database first.
+        self.store = stores.create(self.STORE_BACKEND, "quotes", self.QUOTES_DB, legacy_file=self.QUOTES_FILE,
+                                   flush_delay=self.FLUSH_DELAY)
+        self.quotes = self.store.open()
+
+        # Index the quotes by author for /quote lookups and author autocomplete.
+        self.authors = AuthorIndex(self.quotes)
 
-        # If a quotes.json file exists, read in the quotes from the JSON file
-        # and store them in the list. Otherwise, the quotes list will remain empty.
-        if os.path.exists(self.QUOTES_FILE):
-            with open(self.QUOTES_FILE) as file:
-                self.quotes = json.load(file)
+        # Index the words of the quotes for /quotesearch. If an index file is configured, the saved index is loaded
+        # from it (only the quotes added since it was saved are indexed), otherwise every quote is indexed.
+        self.search_index = QuoteIndex.load(self.INDEX_FILE, self.quotes)
+
+    # Runs when the Cog is loaded. Fetches the submitters of the most recently added quotes in the background so that
+    # /quote does not have to wait on Discord for them.
+    async def cog_load(self):
+        self.bot.user_cache.warm(quote["submitter_id"] for quote in self.quotes[-50:])
+
+    # Runs when the Cog is unloaded. Saves any quotes that have not been written yet and closes the database, then saves
+    # the search index if an index file is configured.
+    async def cog_unload(self):
+        await self.store.close()
+        if self.INDEX_FILE:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self.search_index.save, self.INDEX_FILE, self.quotes)
+            except OSError as error:
+                print(f"Failed to save the quote index: {error}")
+
+    # When the bot runs as several worker processes, adds the quotes that the other processes saved since the last
+    # check to this process's quotes list and indexes.
+    async def sync_quotes(self):
+        if not self.bot.partition.sharded:
+            return
+        for quote in await self.store.refresh():
+            self.quotes.append(quote)
+            self.authors.add(quote["author"], len(self.quotes) - 1)
+            self.search_index.add(quote["quote"], len(self.quotes) - 1)
 
     # Adds the /addquote command. This command takes a quote and an author, gets the submitter's user ID, and saves the
     # submitter ID (user_id), the author of the quote, and the quote text and saves it as a dictionary entry. This is then
-    # added to the quotes list as well as updates the quotes.json file so that quotes persist.
+    # added to the quotes list and queued to be saved to the quotes database so that quotes persist.
     @app_commands.command(name="addquote", description="Adds a quote to the bot")
     @app_commands.describe(quote_text="The quote that was said",
                            author="Who said it?")
     async def add_quote(self, interaction, quote_text:str, author:str):
         user_id = interaction.user.id
         author = author.strip()  # Remove whitespace.
+        self.bot.user_cache.put(interaction.user)  # The submitter is likely to be looked up by /quote later.
 
         new_quote = {
             "submitter_id": user_id,
@@ -43,10 +92,9 @@ class Quotes(commands.Cog):
         }
 
         self.quotes.append(new_quote)
-
-        if os.path.exists(self.QUOTES_FILE):
-            with open(self.QUOTES_FILE, "w") as file:
-                json.dump(self.quotes, file)
+        self.authors.add(author, len(self.quotes) - 1)
+        self.search_index.add(quote_text, len(self.quotes) - 1)
+        self.store.add(new_quote)
 
         await interaction.response.send_message(f"Quote added: {quote_text} - {author}", ephemeral=True)
 
@@ -57,26 +105,67 @@ class Quotes(commands.Cog):
     @app_commands.command(name="quote", description="Displays a saved quote")
     @app_commands.describe(author="(Optional): Get a quote from a specific person!")
     async def quote(self, interaction, author:str=None):
+        await self.sync_quotes()
         if not self.quotes:
             await interaction.response.send_message("No quotes found.", ephemeral=True)
             return
 
         if author:
-            authored_quotes = [q for q in self.quotes if q["author"] == author.strip().lower().capitalize()]
+            authored_quotes = self.authors.get(author)
 
             if not authored_quotes:
                 await interaction.response.send_message(f"No quotes found for {author}.", ephemeral=True)
                 return
-            random_quote = random.choice(authored_quotes)
+            random_quote = self.quotes[random.choice(authored_quotes)]
+
+            # The same author is likely to be asked for again, so fetch the submitters of their other quotes.
+            self.bot.user_cache.warm(self.quotes[position]["submitter_id"] for position in authored_quotes[-10:])
         else:
             random_quote = random.choice(self.quotes)
 
-        submitter = await self.bot.fetch_user(random_quote['submitter_id'])
+        submitter = await self.bot.user_cache.get(random_quote['submitter_id'])
         submitter = submitter.mention
 
         await interaction.response.send_message(
             f"{random_quote['quote']} - {random_quote['author']}\nSubmitted by {submitter}")
 
+    # Adds the /quotesearch command. This command finds the quotes containing the given words, best match first, and
+    # shows them one page at a time. If no quotes contain any of the words, report that no quotes were found.
+    @app_commands.command(name="quotesearch", description="Searches the saved quotes")
+    @app_commands.describe(words="The words to search for",
+                           page="(Optional): The page of results to show")
+    async def quote_search(self, interaction, words:str, page:app_commands.Range[int, 1]=1):
+        await self.sync_quotes()
+        results = self.search_index.search(words)
+        if not results:
+            await interaction.response.send_message(f"No quotes found for {words}.", ephemeral=True)
+            return
+
+        pages = (len(results) + self.PAGE_SIZE - 1) // self.PAGE_SIZE
+        page = min(page, pages)
+        start = (page - 1) * self.PAGE_SIZE
+
+        # Each result gets an equal share of the message, and long quotes are shortened to fit in it, so that a full
+        # page always fits in a single message.
+        share = (MESSAGE_LIMIT - FOOTER_ROOM) // self.PAGE_SIZE - 1
+        lines = []
+        for number, position in enumerate(results[start:start + self.PAGE_SIZE], start + 1):
+            quote = self.quotes[position]
+            prefix = f"{number}. "
+            author = f" - {quote['author'][:100]}"
+            text = shorten(quote["quote"], share - len(prefix) - len(author))
+            lines.append(shorten(prefix + text + author, share))
+
+        response = "\n".join(lines)
+        response += f"\n\nPage {page} of {pages} ({len(results)} quote{'s' if len(results) != 1 else ''} found)"
+        await interaction.response.send_message(response)
+
+    # Suggests authors for the author parameter of /quote as the user types, based on the names of authors that have
+    # quotes saved.
+    @quote.autocomplete("author")
+    async def author_autocomplete(self, interaction, current:str):
+        return [app_commands.Choice(name=name[:100], value=name[:100]) for name in self.authors.complete(current)]
+
 #Setups cog for Quotes commands.
 async def setup(bot):
         await bot.add_cog(Quotes(bot))
\ No newline at end of file
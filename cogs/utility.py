@@ -5,6 +5,9 @@
 from discord import app_commands
 from discord.ext import commands
 
+# Discord allows up to 2000 characters in a message.
+MESSAGE_LIMIT = 2000
+
 class Utility(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -22,10 +25,36 @@ class Utility(commands.Cog):
                         "/ping: Replies with latency to server\n"
                         "/addquote: Adds a quote\n"
                         "/quote: displays a saved quote\n"
-                        "/wordle: Initiates a game of wordle (must be in the #wordle channel to start the game)\n"
+                        "/quotesearch: Searches the saved quotes for the given words\n"
+                        "/wordle: Initiates a game of wordle in its own thread (must be in the #wordle channel to start the game)\n"
+                        "/hint: Shows how many words are still possible in the current Wordle game and suggests a guess\n"
                         "/grass: Reminds everyone to touch grass\n"
                         "/water: Reminds everyone to drink water\n")
         await interaction.response.send_message(help_message, ephemeral=True)
 
+    # Adds the /stats command (administrators only). Responds with the slowest commands, listeners, and REST routes,
+    # the event loop lag, the counters, and the user cache hit rates.
+    @app_commands.command(name="stats", description="Displays the bot's performance stats (admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def stats(self, interaction):
+        header = f"{'name':<32} {'count':>7} {'mean':>8} {'p50':>8} {'p99':>8}"
+        rows = [f"{(kind + ' ' + name)[:32]:<32} {count:>7} {mean * 1000:>6.1f}ms {p50 * 1000:>6.1f}ms {p99 * 1000:>6.1f}ms"
+                for kind, name, count, mean, p50, p99 in self.bot.metrics.summary()[:20]]
+
+        counters = self.bot.metrics.counters
+        footer = "\n".join([", ".join(f"{name}: {value}" for name, value in sorted(counters.items())) or "No counters yet.",
+                            ", ".join(f"{name}: {value}" for name, value in self.bot.user_cache.stats().items()),
+                            ", ".join(f"{name}: {value}" for name, value in self.bot.dispatcher.stats().items())])
+        footer = footer[:MESSAGE_LIMIT // 2]
+
+        # Leave out the fastest rows until the message fits, so that the code block is always closed.
+        while True:
+            message = "```\n" + "\n".join([header] + rows) + "\n```\n" + footer
+            if len(message) <= MESSAGE_LIMIT or not rows:
+                break
+            rows.pop()
+        await interaction.response.send_message(message, ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(Utility(bot))
\ No newline at end of file
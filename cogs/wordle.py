@@ -12,19 +12,76 @@ import os
 from collections import defaultdict
 import asyncio
 from time import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from configparser import ConfigParser
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from core import feedback, solver, stores, wordlist
+from core.board import Board
+from core.dispatcher import RESULT, UPDATE, ERROR
+
+# The word lengths that can be played, offered as the choices for /wordle's length. These are read when the module is
+# loaded, since the command's choices are set before the Cog is created.
+_config = ConfigParser()
+_config.read("./config.ini")
+LENGTHS = [int(length) for length in _config.get("Wordle", "LENGTHS", fallback="5").split(",")]
 
 # An instance of a wordle game. The instance will contain the answer of this round, the attempts which consists
-# of the guesser, the guess itself, and the bot's chat response, the start time, the number of attempts, and a timeout
-# task placeholder variable for the handle_timeout coroutine.
+# of the guesser, the guess itself, and the bot's chat response, the start time, the number of attempts, the timers
+# scheduled for this game (the reminder and the timeout), the board that shows the guesses in the channel, and a bitset
+# of the answers that are still possible given the feedback so far (used by /hint). The length of the words in the game
+# is the length of the answer. Games are saved as snapshots (see snapshot) so that they can be restored after a restart.
 class GameInstance:
-    def __init__(self, answer):
+    __slots__ = ("answer", "length", "attempts", "start_time", "num_attempts", "points_available", "timers", "board",
+                 "candidates")
+
+    def __init__(self, answer, board=None, candidates=0, start_time=None):
         self.answer = answer.lower()
+        self.length = len(self.answer)
         self.attempts = []
-        self.start_time = time()
+        self.start_time = time() if start_time is None else start_time
         self.num_attempts = 0
         self.points_available = defaultdict(int)
-        self.timeout_task = None
+        self.timers = []
+        self.board = board
+        self.candidates = candidates
+
+    # Returns the state of the game that needs to be saved to restore it, as a dictionary of plain values. The timers,
+    # the board, and the possible answers are rebuilt when the game is restored.
+    def snapshot(self):
+        return {"answer": self.answer, "start_time": self.start_time, "points_available": dict(self.points_available),
+                "attempts": list(self.attempts)}
+
+    # Creates a game from a snapshot.
+    @classmethod
+    def from_snapshot(cls, snapshot, board=None, candidates=0):
+        game = cls(snapshot["answer"], board, candidates, snapshot["start_time"])
+        game.attempts = [tuple(attempt) for attempt in snapshot["attempts"]]
+        game.num_attempts = len(game.attempts)
+        game.points_available.update(snapshot["points_available"])
+        return game
+
+# The word lists for one word length, along with what is built from them: the bitsets used to track the possible answers
+# and, for 5 letter words, the precomputed feedback matrix (which stores each pattern in a single byte, so it only
+# covers words of up to 5 letters).
+class Variant:
+    def __init__(self, length, index, answer_file=None, valid_file=None, feedback_file=None):
+        self.length = length
+        self.index = index
+        self.answer_file = answer_file
+        self.valid_file = valid_file
+        self.solver = solver.Solver(index.answers)
+        self.feedback = None
+        self.feedback_task = None
+        if feedback_file and length == 5:
+            self.feedback = feedback.FeedbackMatrix(feedback_file, index.answers, index.guesses)
+
+    # Scores a guess. This is a single lookup in the feedback matrix if it is loaded, otherwise it is computed directly.
+    def score(self, answer, guess):
+        if self.feedback:
+            return self.feedback.score(answer, guess)
+        return feedback.score_guess(answer, guess)
 
 # The Wordle Cog itself which handles the main logic for the Wordle game and it's commands. Initialized with the bot,
 # the list of answers and valid words, the channel name of where wordle will run, the embedded message title, the
@@ -35,37 +92,151 @@ class Wordle(commands.Cog):
         self.bot = bot
         self.config = ConfigParser()
         self.config.read("./config.ini")
-        self.words = []
-        self.valid = []
         self.games = {}
-        self.leaderboard = defaultdict(int)
         self.CHANNEL_NAME = self.config.get("Wordle", "CHANNEL_NAME", fallback="wordle")
         self.EMBED_NAME = self.config.get("Wordle", "EMBED_NAME", fallback="Wordle! (Beta)")
         self.DURATION = int(self.config.get("Wordle", "DURATION", fallback=300))
-        self.ANSWER_FILE = self.config.get("Wordle", "ANSWER_FILE", fallback=None)
-        self.VALID_FILE = self.config.get("Wordle", "VALID_FILE", fallback=None)
-
-        # Check to see if there is an answers and a valid file for the word list. If so, populate the lists with their
-        # content. Otherwise, use a simple list of sample words.
-        if os.path.exists(self.ANSWER_FILE) and os.path.exists(self.VALID_FILE):
-            with open(self.ANSWER_FILE) as file:
-                for word in file:
-                    self.words.append(word.strip())
-                    self.valid.append(word.strip())
-
-                with open(self.VALID_FILE) as file:
-                    for word in file:
-                        self.valid.append(word.strip())
+        self.BOARD_DELAY = float(self.config.get("Wordle", "BOARD_DELAY", fallback=1.0))
+        self.RESET_TIMEZONE = ZoneInfo(self.config.get("Wordle", "RESET_TIMEZONE", fallback="America/Chicago"))
+        self.reset_timer = None
+        self.DEFAULT_LENGTH = int(self.config.get("Wordle", "DEFAULT_LENGTH", fallback=5))
+        self.LENGTHS = LENGTHS
+        self.THREADS = self.config.getboolean("Wordle", "THREADS", fallback=True)
+        self.LEADERBOARD_DB = self.config.get("Wordle", "LEADERBOARD_DB", fallback="./data/wordle.db")
+        self.GAMES_DB = self.config.get("Wordle", "GAMES_DB", fallback="./data/games.db")
+        self.PAGE_SIZE = int(self.config.get("Wordle", "PAGE_SIZE", fallback=10))
+        self.HINT_POOL = int(self.config.get("Wordle", "HINT_POOL", fallback=300))
+        self.HINT_SAMPLE = int(self.config.get("Wordle", "HINT_SAMPLE", fallback=1000))
+        self.STORE_BACKEND = self.config.get("Bot", "STORE_BACKEND", fallback="sqlite")
+        self.variants = {}  # Word length -> Variant, loaded the first time a game with that length is played.
+        self.hint_pool = None
+        self.build_pool = None
+
+        # Open the leaderboard store (the backend set by STORE_BACKEND) and load each server's leaderboard.
+        self.standings = stores.create(self.STORE_BACKEND, "leaderboard", self.LEADERBOARD_DB, partition=self.bot.partition)
+        self.standings.open()
+
+        # Open the store of running games and read in the games that were running when the bot last stopped. They are
+        # restored when the Cog is loaded.
+        self.game_store = stores.create(self.STORE_BACKEND, "games", self.GAMES_DB, partition=self.bot.partition)
+        self.snapshots = self.game_store.open()
+
+    # Returns the setting for the given word length. Each length has its own files (ANSWER_FILE_4, VALID_FILE_4, and so
+    # on), and the default length can also use the settings without a length (ANSWER_FILE, VALID_FILE, ...).
+    def setting(self, key, length):
+        fallback = self.config.get("Wordle", key, fallback=None) if length == self.DEFAULT_LENGTH else None
+        return self.config.get("Wordle", f"{key}_{length}", fallback=fallback)
+
+    # Returns the word lists for the given length, loading them the first time they are needed, or None if that length
+    # is not available. If there is an answers and a valid file for the length, they are loaded into the word index (from
+    # the compiled word list cache when it is up to date) and, if a feedback file is configured, the precomputed
+    # feedback matrix is set up. Otherwise, the default length uses a simple list of sample words.
+    def variant(self, length):
+        if length in self.variants:
+            return self.variants[length]
+        if not self.available(length):
+            return None
+
+        answer_file = self.setting("ANSWER_FILE", length)
+        valid_file = self.setting("VALID_FILE", length)
+        if self.has_word_lists(length):
+            index = wordlist.load(answer_file, valid_file, self.setting("WORDS_CACHE", length))
+            variant = Variant(length, index, answer_file, valid_file, self.setting("FEEDBACK_FILE", length))
         else:
-            self.words = self.valid = ["chair", "table", "plant", "apple", "grape", "brick", "story", "shelf", "piano", "train"]
+            sample = ["chair", "table", "plant", "apple", "grape", "brick", "story", "shelf", "piano", "train"]
+            variant = Variant(length, wordlist.WordIndex(sample, sample))
+
+        self.variants[length] = variant
+        self.open_feedback(variant)
+        return variant
+
+    # Returns whether the given length can be played, without loading its word lists.
+    def available(self, length):
+        if length in self.variants:
+            return True
+        return length in self.LENGTHS and (self.has_word_lists(length) or length == self.DEFAULT_LENGTH)
+
+    # Returns whether the answers and valid files for the given length are configured and exist.
+    def has_word_lists(self, length):
+        answer_file = self.setting("ANSWER_FILE", length)
+        valid_file = self.setting("VALID_FILE", length)
+        return bool(answer_file and valid_file and os.path.exists(answer_file) and os.path.exists(valid_file))
+
+    # Memory-maps the variant's feedback matrix if it is up to date with the word lists, otherwise starts rebuilding it
+    # in the background. Guesses are scored directly until the matrix is ready.
+    def open_feedback(self, variant):
+        if variant.feedback is None:
+            return
+
+        source_fingerprint = wordlist.fingerprint(variant.answer_file, variant.valid_file)
+        if not variant.feedback.open(source_fingerprint):
+            variant.feedback_task = asyncio.create_task(self.build_feedback(variant, source_fingerprint))
+
+    # Runs when the Cog is loaded. Loads the word lists for the default length (the other lengths are loaded when they
+    # are first played), schedules the weekly leaderboard reset (resetting right away if the bot was offline for the
+    # last one), and restores the games that were running when the bot stopped.
+    async def cog_load(self):
+        self.variant(self.DEFAULT_LENGTH)
+        await self.schedule_reset()
+        self.restore_games()
+
+    # Runs when the Cog is unloaded. Stops any running games (they stay saved, so they are restored when the Cog is
+    # loaded again), cancels the leaderboard reset, stops any running matrix builds and unmaps the matrices, and shuts
+    # down the processes used for building matrices and for hints without waiting for them.
+    async def cog_unload(self):
+        for channel_id in list(self.games):
+            self.stop_game(channel_id)
+        if self.reset_timer:
+            self.reset_timer.cancel()
+        await self.standings.close()
+        await self.game_store.close()
+        for variant in self.variants.values():
+            if variant.feedback_task:
+                variant.feedback_task.cancel()
+            if variant.feedback:
+                variant.feedback.close()
+        if self.build_pool:
+            self.build_pool.shutdown(wait=False, cancel_futures=True)
+        if self.hint_pool:
+            self.hint_pool.shutdown(wait=False, cancel_futures=True)
+
+    # Builds the feedback matrix in a separate process (building it takes a while and would otherwise stall the event
+    # loop), then maps it once it has been written. The process is started with spawn rather than fork, since the bot
+    # already has database and executor threads running that a forked process would inherit in an unknown state. The
+    # pool is shut down by cog_unload, so cancelling a build does not wait for it to finish.
+    async def build_feedback(self, variant, source_fingerprint):
+        loop = asyncio.get_running_loop()
+        matrix = variant.feedback
+        if self.build_pool is None:
+            self.build_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        await loop.run_in_executor(self.build_pool, feedback.build_matrix, matrix.path, list(matrix.answers),
+                                   list(matrix.guesses), source_fingerprint)
+        if matrix.open(source_fingerprint):
+            print("Wordle feedback matrix built!")
+
+    # Returns the #wordle channel that the given channel belongs to (the channel itself, or the channel a game thread
+    # was created in), or None if it is not part of the #wordle channel.
+    def wordle_channel(self, channel):
+        if channel.name == self.CHANNEL_NAME:
+            return channel
+        parent = getattr(channel, "parent", None)
+        if parent is not None and parent.name == self.CHANNEL_NAME:
+            return parent
+        return None
 
     # Creates the command for /wordle, which will begin a new game of Wordle if the user is in the #wordle text channel.
+    # Each game runs in its own thread under the #wordle channel, so several games can run at once, and the length of
+    # the word can be picked.
     @app_commands.command(name="wordle", description="Starts a game of Wordle!")
-    async def wordle(self, interaction):
-        # Check to see if the current channel is the #wordle channel. If not, see if the channel exists and if it does,
-        # report to the user that they must use the #wordle channel and return. If the channel does not exist, notify the user that
-        # a #wordle channel was not found and that one needs to be setup to play and return.
-        if interaction.channel.name != self.CHANNEL_NAME:
+    @app_commands.describe(length="(Optional): The number of letters in the word")
+    @app_commands.choices(length=[app_commands.Choice(name=f"{length} letters", value=length) for length in LENGTHS])
+    async def wordle(self, interaction, length:int=None):
+        # Check to see if the current channel is the #wordle channel (or a thread in it). If not, see if the channel
+        # exists and if it does, report to the user that they must use the #wordle channel and return. If the channel
+        # does not exist, notify the user that a #wordle channel was not found and that one needs to be setup to play
+        # and return.
+        wordle_channel = self.wordle_channel(interaction.channel)
+        if wordle_channel is None:
             channel = discord.utils.get(interaction.guild.text_channels, name=self.CHANNEL_NAME)
             if channel:
                 embed = discord.Embed(title=self.EMBED_NAME, description=f"Please use the {channel.mention} channel to start a game!", color=discord.Color.red())
@@ -74,76 +245,107 @@ class Wordle(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        # If the #wordle channel exists and the command was run in the /wordle channel, get the channel ID.
-        current_channel = interaction.channel.id
+        # Check that there are word lists for the length (the default length if none was given). If there are none,
+        # report this to the user and return.
+        length = length or self.DEFAULT_LENGTH
+        if not self.available(length):
+            embed = discord.Embed(title=self.EMBED_NAME, description=f"{length} letter words are not available!", color=discord.Color.red())
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
 
-        # Check if a game is already running. If so, report this to the user and return.
-        if current_channel in self.games:
+        # Without threads, the game runs in the #wordle channel, so check if a game is already running there. If so,
+        # report this to the user and return.
+        if not self.THREADS and wordle_channel.id in self.games:
             embed = discord.Embed(title=self.EMBED_NAME, description="A game is already running!", color=discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
+        # Loading the word lists and creating the thread can take longer than Discord waits for a response, so defer
+        # the response and send the announcement as a followup.
+        await interaction.response.defer(thinking=True)
+        variant = self.variant(length)
+
+        # Create a thread for the game under the #wordle channel. If threads are turned off (or the thread could not
+        # be created), the game runs in the #wordle channel itself.
+        game_channel = None
+        if self.THREADS:
+            try:
+                game_channel = await wordle_channel.create_thread(name=f"Wordle ({length} letters) - {interaction.user.name}"[:100],
+                                                                  type=discord.ChannelType.public_thread, auto_archive_duration=60)
+            except discord.HTTPException as error:
+                print(f"Failed to create a Wordle thread: {error}")
+        game_channel = game_channel or wordle_channel
+
+        # Get the channel ID of the channel the game runs in, and check if a game is already running there (only possible
+        # if the thread could not be created). If so, report this to the user and return.
+        current_channel = game_channel.id
+        if current_channel in self.games:
+            embed = discord.Embed(title=self.EMBED_NAME, description="A game is already running!", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
+
         # If a game is not running, select a random word and create a new instance of the Wordle game, and store it
-        # in the games dictionary with the key being the current channel ID as well as create a new asynchronous task
-        # to handle timeouts (the maximum time duration allowed for the game is up) and store it in the game instance.
-        answer = random.choice(self.words)
+        # in the games dictionary with the key being the game's channel (or thread) ID. Then schedule its timers and
+        # start routing the channel's messages to it, and save it so that it survives a restart.
+        answer = random.choice(variant.index.answers)
         print(answer) #Debuggin'
-        game = self.games[current_channel] = GameInstance(answer)
-        game.timeout_task = asyncio.create_task(self.handle_timeout(current_channel))
+        board = Board(game_channel, self.bot.dispatcher, self.EMBED_NAME, self.BOARD_DELAY)
+        game = self.games[current_channel] = GameInstance(answer, board, variant.solver.all)
 
         for letter in game.answer:
             game.points_available[letter] += 2
 
+        self.run_game(current_channel, game)
+        self.game_store.start(current_channel, interaction.guild.id, game.snapshot())
+
         # Send the message to the user that the game has begun!
         # embed = discord.Embed(title=self.EMBED_NAME, description="A game of Wordle has been initiated! You have 6 tries to guess the word, type your guess in chat! (Must be a 5 letter word)", colour=discord.Colour.green())
-        embed = discord.Embed(title=self.EMBED_NAME, description=f"A game of Wordle has been initiated! You have {self.DURATION // 60} minutes to guess the word, type your guess in chat! (Must be a 5 letter word)", colour=discord.Colour.green())
-        await interaction.response.send_message(embed=embed)
-
-    # Event listener for messages. Will trigger for every message that is sent, but the only logic that will apply is
-    # if the message was sent in the #wordle channel and ONLY contains a 5 letter word with a game currently running.
-    @commands.Cog.listener()
-    async def on_message(self, message):
+        where = f" in {game_channel.mention}" if game_channel is not interaction.channel else ""
+        embed = discord.Embed(title=self.EMBED_NAME, description=f"A game of Wordle has been initiated{where}! You have {self.DURATION // 60} minutes to guess the word, type your guess in chat! (Must be a {length} letter word)", colour=discord.Colour.green())
+        await interaction.followup.send(embed=embed)
+
+    # Handler for messages sent in a channel with a game running. The bot's message router only calls this for channels
+    # registered when a game was started, so messages from every other channel never reach it. The only logic that will
+    # apply is if the message ONLY contains a word of the game's length.
+    async def on_guess(self, message):
         # If the message was sent by the bot, ignore it and return.
         if message.author == self.bot.user:
             return
 
-        # If the message was not sent in #wordle, ignore it and return.
-        if message.channel.name != self.CHANNEL_NAME:
-            return
-
-        # Get the channel ID of the current channel (should be #wordle).
+        # Get the channel ID of the current channel (the game's thread, or #wordle).
         current_channel = message.channel.id
 
-        # If the current_channel is not found in the games dictionary (that is, a game is not running), ignore the
-        # message and return. If we pass this if statement, then we now know that a game is indeed running.
-        if current_channel not in self.games:
+        # Get the current game instance for this channel. If it is not found in the games dictionary (that is, a game
+        # is not running), ignore the message and return. If we pass this if statement, then we now know that a game is
+        # indeed running.
+        game = self.games.get(current_channel)
+        if game is None:
             return
+        variant = self.variants[game.length]
 
         # Get the message content, strip it of any whitespace and set all characters to lowercase.
         content = message.content.strip().lower()
 
         # Use a regular expression to check if the message contains only lowercase letters of the alphabet and that
-        # the message is only 5 characters long. If it is not, ignore the message and return. If we pass this if
+        # the message is as long as the game's word. If it is not, ignore the message and return. If we pass this if
         # statement, we know a game is running and that the sent message was a guess that matches the approriate
         # pattern.
-        if not re.fullmatch(r"[a-z]{5}", content):
+        if not re.fullmatch(f"[a-z]{{{game.length}}}", content):
             return
 
         # If the sent message is a word not in the valid list (that is, it is not a valid word), report this to the
-        # user and return.
-        if content not in self.valid:
+        # user and return. Errors are queued at a low priority, so game results and boards go out first when the
+        # channel is busy.
+        if content not in variant.index:
             embed = discord.Embed(title=self.EMBED_NAME, description=f"{content.upper()} is not a valid word!", color=discord.Color.red())
-            await message.channel.send(embed=embed)
+            self.bot.dispatcher.post(message.channel, embed, ERROR)
             return
 
-        # Get the current game instance for this channel.
-        game = self.games[current_channel]
-
         # Check to see if the guessed word was used at all in this game. We do this by checking the attempts list to see
         # if the current guess has appeared elsewhere in the game. If it has, report this to the user and return.
         if any(past_guess == content for _, past_guess, _ in game.attempts):
             embed = discord.Embed(title=self.EMBED_NAME, description=f"{content.upper()} has already been guessed!", color=discord.Color.red())
-            await message.channel.send(embed=embed)
+            self.bot.dispatcher.post(message.channel, embed, ERROR)
             return
 
         # At this point, we now know that the user has made a valid guess, so we increment the number of attempts by 1
@@ -151,47 +353,20 @@ class Wordle(commands.Cog):
         # this guess.
         game.num_attempts += 1
 
-        # Create 2 empty string variables for the history of past responses by the bot and the new reponse line
-        # to be added when the bot reports the past guesses and the newest guess that we just received.
-        history = ""
-        response = ""
-
-        # This simply gets every guesser and their past responses and adds them to the history string, which will be
-        # sent out as part of the bots response to the guess. If this is the first guess, then this will be skipped
-        # automatically.
-        for guesser, _, past_response in game.attempts:
-            history += f"{past_response} - Guessed by {guesser}\n"
-
-        # Create a dictionary for every available letter in the answer, and increment each one's count by 1. This is
-        # how we will determine how many times a letter has been used in the current guess. The key is the letter and
-        # the value is the amount of letters in the answer.
-        available_letters = defaultdict(int)
-        for letter in game.answer:
-            available_letters[letter] += 1
+        # Score the guess. This is a single lookup in the feedback matrix if it is loaded, otherwise it is computed
+        # directly. The pattern holds one square per letter: green for the right letter in the right place, yellow for
+        # a letter found elsewhere in the answer, and black for a letter that is not in the answer at all.
+        pattern = variant.score(game.answer, content)
 
-        # This boolean list will be used for the first pass through the answer. A 0 at a position indicates an incorrect
-        # placement of a letter, and 1 indicates a correct placement.
-        correct_pos = [0] * 5
+        # Narrow down the answers that are still possible to the ones that would have given the same feedback.
+        game.candidates &= variant.solver.constraint(content, pattern)
 
         score = 0
 
-        # For every letter in content, compare it to that of the answer and if the letter is in the appropriate place,
-        # update the value of correct_pos to reflect that the current letter is in the correct position, and decrement
-        # the count of this letter by 1.
-        for i, letter in enumerate(content):
-            if content[i] == game.answer[i]:
-                correct_pos[i] = 1
-                available_letters[letter] -= 1
-
-        # For every letter in content, first compare it to the correct_pos list element at the same position and if it
-        # is 1 (that is, the letter is in the appropriate place), to that of the answer and if the letter is in the
-        # appropriate place, add a green square emoji to the responser. Otherwise, if the letter is not in the right
-        # place but is found elsewhere in the answer, add a yellow square emoji indicating the letter is in the answer,
-        # just not here. Finally, if the letter is not in the answer at all, add a black square emoji to the response.
-        for i, letter in enumerate(content):
-            if correct_pos[i] == 1:
-                response += ":green_square: "
-
+        # For every letter in content, award points for green and yellow squares while points for that letter are
+        # still available.
+        for letter, square in zip(content, feedback.decode(pattern, game.length)):
+            if square == feedback.GREEN:
                 if game.points_available[letter] >= 2:
                     score += 2
                     game.points_available[letter] -= 2
@@ -199,22 +374,19 @@ class Wordle(commands.Cog):
                     score += 1
                     game.points_available[letter] -= 1
 
-            elif content[i] in game.answer and available_letters[letter] > 0:
-                response += ":yellow_square: "
-
+            elif square == feedback.YELLOW:
                 if game.points_available[letter] >= 1:
                     score += 1
                     game.points_available[letter] -= 1
-                available_letters[letter] -= 1
 
-            else:
-                response += ":black_large_square: "
+        # Render the new row of the board: the squares, the guess in all capitals, the guesser, and the points earned.
+        response = f"{feedback.render(pattern, game.length)} {content.upper()} - Guessed by {message.author.mention} (+{score})"
 
-        # Add the guess to the response, and make the guess all capitalized.
-        response += f"{content.upper()}"
-
-        # Add the guesser, the guess, and the response to the game's attempts list.
-        game.attempts.append((message.author.mention, content, response))
+        # Add the guesser, the guess, and the response to the game's attempts list, and save the attempt along with the
+        # points that are still available.
+        attempt = (message.author.mention, content, response)
+        game.attempts.append(attempt)
+        self.game_store.guess(current_channel, game.num_attempts, attempt, dict(game.points_available))
 
         # Get the amount of time elapsed to calculate the amount of time remaining, and always round the time up to the
         # nearest minute. (For example, if there is 1 minute and 30 seconds remaining, round up to 2 whole minutes).
@@ -222,30 +394,68 @@ class Wordle(commands.Cog):
         time_remaining = max(0, self.DURATION - time_elapsed)
         time_remaining = int((time_remaining + 59) // 60)
 
-        self.leaderboard[message.author.mention] += score
+        self.standings.add(message.guild.id, message.author.id, score)
 
-        # Set the response to the history string (all past responses) and concatenate the new response to the end of
-        # the history string, and then concatenate the guesser to the end of the message.
-        response = history + response + f" - Guessed by {message.author.mention} (+{score})\n\n{time_remaining} minute{'s' if time_remaining != 1 else ''} remaining!"
+        # Add the new row to the board. Only the new row is rendered; the board keeps the rows it already has and edits
+        # its message in place, combining guesses that arrive close together into a single edit. Games restored after a
+        # restart start a new board message with their next guess.
+        if game.board is None:
+            game.board = Board(message.channel, self.bot.dispatcher, self.EMBED_NAME, self.BOARD_DELAY)
+        await game.board.add(response, f"{time_remaining} minute{'s' if time_remaining != 1 else ''} remaining!")
 
-        # Create the embedded message with the response and send it.
-        embed = discord.Embed(title=self.EMBED_NAME, description=response, color=discord.Color.green())
-        await message.channel.send(embed=embed)
-
-        # If the guess is the answer, report that the guesser got the word and the number of attempts used, and delete
-        # the game instance for the games dictionary, ending the game, and return.
+        # If the guess is the answer, end the game first (so no more guesses are taken while the results go out) and
+        # award the points, show the final board right away, then report that the guesser got the word and the number
+        # of attempts used, and return.
         if content == game.answer:
-            self.leaderboard[message.author.mention] += 4
+            self.end_game(current_channel)
+            self.standings.add(message.guild.id, message.author.id, 4)
+            await game.board.flush(wait=True)
             embed = discord.Embed(title=self.EMBED_NAME, description=f'{message.author.mention} guessed the correct word {game.answer.upper()} in {game.num_attempts} tries and has been awarded 4 points! Well done!', color=discord.Color.green())
-            await message.channel.send(embed=embed)
-            game.timeout_task.cancel()
-            del self.games[current_channel]
+            await self.bot.dispatcher.send(message.channel, embed, RESULT)
+            return
+
+    # Creates the command for /hint, which tells the user how many answers are still possible in the running game and
+    # suggests the guess expected to narrow them down the most. The search runs in a separate (spawned, like the matrix
+    # build) process so that it does not stall the event loop, and only the user who asked can see the hint.
+    @app_commands.command(name="hint", description="Shows how many words are still possible and suggests a guess")
+    async def hint(self, interaction):
+        game = self.games.get(interaction.channel.id)
+        if game is None:
+            embed = discord.Embed(title=self.EMBED_NAME, description="There is no game running in this channel!", color=discord.Color.red())
+            await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-    # Handles displaying the leaderboard stats
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        variant = self.variants[game.length]
+        candidates = variant.solver.words(game.candidates)
+        guessed = {guess for _, guess, _ in game.attempts}
+        guesses = [guess for guess in variant.index.guesses if guess not in guessed]
+        sample, pool = solver.search_space(candidates, guesses, self.HINT_POOL, self.HINT_SAMPLE, seed=game.start_time)
+
+        matrix_args = None
+        if variant.feedback and variant.feedback.ready:
+            matrix_args = (variant.feedback.path, list(variant.feedback.answers), list(variant.feedback.guesses),
+                           wordlist.fingerprint(variant.answer_file, variant.valid_file))
+
+        if self.hint_pool is None:
+            self.hint_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        suggestion, bits = await loop.run_in_executor(self.hint_pool, solver.best_guess, sample, pool, matrix_args)
+
+        if len(candidates) == 1:
+            description = f"Only 1 word is still possible. Try {suggestion.upper()}!"
+        else:
+            description = f"{len(candidates)} words are still possible. Try {suggestion.upper()} (about {bits:.1f} bits of information)."
+        embed = discord.Embed(title=self.EMBED_NAME, description=description, color=discord.Color.gold())
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    # Handles displaying the leaderboard stats, one page at a time. Also shows the user's own rank if they are not on
+    # the page.
     @app_commands.command(name="leaderboard", description="Displays the current leaderboard for Wordle!")
-    async def leaderboard(self, interaction):
-        if interaction.channel.name != self.CHANNEL_NAME:
+    @app_commands.describe(page="(Optional): The page of the leaderboard to show")
+    async def leaderboard(self, interaction, page:app_commands.Range[int, 1]=1):
+        if self.wordle_channel(interaction.channel) is None:
             channel = discord.utils.get(interaction.guild.text_channels, name=self.CHANNEL_NAME)
             if channel:
                 embed = discord.Embed(title=self.EMBED_NAME, description=f"Please use the {channel.mention} channel to display the leaderboard!", color=discord.Color.red())
@@ -254,37 +464,114 @@ class Wordle(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        response = ""
-        sorted_leaderboard = sorted(self.leaderboard.items(), key=lambda item: item[1], reverse=True)
+        leaderboard = self.standings.get(interaction.guild.id)
+        pages = max(1, (len(leaderboard) + self.PAGE_SIZE - 1) // self.PAGE_SIZE)
+        page = min(page, pages)
+        start = (page - 1) * self.PAGE_SIZE
 
-        for i, (user, score) in enumerate(sorted_leaderboard):
-            response += f"{i+1}. {user}: {score}\n"
+        lines = [f"{leaderboard.rank(user_id)}. <@{user_id}>: {score}" for user_id, score in leaderboard.top(self.PAGE_SIZE, start)]
+        if not lines:
+            lines.append("No scores yet this week!")
 
+        user_rank = leaderboard.rank(interaction.user.id)
+        if user_rank is not None and not start < user_rank <= start + self.PAGE_SIZE:
+            lines.append(f"\nYour rank: {user_rank}. {interaction.user.mention}: {leaderboard.scores[interaction.user.id]}")
+
+        response = "\n".join(lines)
+        response += f"\n\nPage {page} of {pages}"
         response += "\nThe leaderboard resets every Sunday at 12PM Central Time!"
 
         embed = discord.Embed(title=self.EMBED_NAME, description=response, color=discord.Color.green())
         await interaction.response.send_message(embed=embed)
 
-    # Handles ending the game if the time has run out.
+    # Starts running a game in the given channel: schedules the timeout (the maximum time duration allowed for the game
+    # is up) with the bot's scheduler, along with a reminder a minute before it if there is still time for one, stores
+    # the timers in the game instance, and registers with the bot's message router so that messages sent in the
+    # channel are passed to on_guess while the game is running.
+    def run_game(self, channel_id, game):
+        end_time = game.start_time + self.DURATION
+        game.timers.append(self.bot.scheduler.call_at(end_time, self.handle_timeout, channel_id))
+        if self.DURATION > 60 and end_time - 60 > time():
+            game.timers.append(self.bot.scheduler.call_at(end_time - 60, self.handle_reminder, channel_id))
+        self.bot.router.register(channel_id, self.on_guess)
+
+    # Restores the games saved when the bot last stopped. The time remaining is worked out from each game's start time
+    # (games whose time ran out while the bot was offline time out right away), and the possible answers are rebuilt
+    # from the guesses made so far.
+    def restore_games(self):
+        snapshots, self.snapshots = self.snapshots, {}
+        for channel_id, snapshot in snapshots.items():
+            game = GameInstance.from_snapshot(snapshot)
+            variant = self.variant(game.length)
+            if variant is None:  # The game's word length is no longer available.
+                self.game_store.end(channel_id)
+                continue
+            game.candidates = variant.solver.all
+            for _, guess, _ in game.attempts:
+                game.candidates &= variant.solver.constraint(guess, variant.score(game.answer, guess))
+            self.games[channel_id] = game
+            self.run_game(channel_id, game)
+        if snapshots:
+            print(f"Restored {len(snapshots)} Wordle games")
+
+    # Stops the game running in the given channel: removes it from the games dictionary, cancels its timers, and stops
+    # routing the channel's messages to on_guess. Returns the game, or None if there was no game running.
+    def stop_game(self, channel_id):
+        game = self.games.pop(channel_id, None)
+        if game:
+            for timer in game.timers:
+                timer.cancel()
+            if game.board:
+                game.board.close()
+        self.bot.router.unregister(channel_id, self.on_guess)
+        return game
+
+    # Ends the game running in the given channel: stops it and removes its saved state.
+    def end_game(self, channel_id):
+        if self.stop_game(channel_id):
+            self.game_store.end(channel_id)
+
+    # Handles ending the game if the time has run out. Called by the bot's scheduler when the game's time is up.
     async def handle_timeout(self, channel_id):
-        try:
-            # Sleep for the duration of the game.
-            await asyncio.sleep(self.DURATION)
-
-            # If the coroutine is woken back up, time is up for the game. If the game is still running and the channel
-            # still exists (it should), then send an embedded message that the time is up with the correct answer and
-            # delete the game from the games dictionary.
-            game = self.games.get(channel_id)
-            if game:
-                channel = self.bot.get_channel(channel_id)
-                if channel:
-                    embed = discord.Embed(title=self.EMBED_NAME, description=f"Time's Up! The correct word was {game.answer.upper()}!", color=discord.Color.red())
-                    await channel.send(embed=embed)
-                    del self.games[channel_id]
-        # Catch the exception if the game ended due to the correct word being guessed within the time limit and ignore
-        # it.
-        except asyncio.CancelledError:
-            pass
+        # If the game is still running, end it and show the final board, and if the channel still exists (it should),
+        # then send an embedded message that the time is up with the correct answer.
+        game = self.games.get(channel_id)
+        if game:
+            self.end_game(channel_id)
+            if game.board:
+                await game.board.flush(wait=True)
+            await self.bot.wait_until_ready()  # A restored game can time out before the bot has connected.
+            channel = self.bot.get_channel(channel_id)
+            if channel:
+                embed = discord.Embed(title=self.EMBED_NAME, description=f"Time's Up! The correct word was {game.answer.upper()}!", color=discord.Color.red())
+                await self.bot.dispatcher.send(channel, embed, RESULT)
+
+    # Reminds the channel that there is one minute left in the game. Called by the bot's scheduler.
+    async def handle_reminder(self, channel_id):
+        channel = self.bot.get_channel(channel_id)
+        if channel_id in self.games and channel:
+            embed = discord.Embed(title=self.EMBED_NAME, description="1 minute remaining!", color=discord.Color.gold())
+            await self.bot.dispatcher.send(channel, embed, UPDATE)
+
+    # Schedules the next leaderboard reset, which happens every Sunday at 12PM (Central Time by default). If the last
+    # reset was missed (the bot was offline), the leaderboard is reset right away.
+    async def schedule_reset(self):
+        now = datetime.now(self.RESET_TIMEZONE)
+        next_reset = (now + timedelta(days=(6 - now.weekday()) % 7)).replace(hour=12, minute=0, second=0, microsecond=0)
+        if next_reset <= now:
+            next_reset += timedelta(days=7)
+
+        previous_reset = (next_reset - timedelta(days=7)).timestamp()
+        if self.standings.last_reset is None or self.standings.last_reset < previous_reset:
+            await self.standings.reset(previous_reset)
+
+        self.reset_timer = self.bot.scheduler.call_at(next_reset.timestamp(), self.reset_leaderboard, next_reset.timestamp())
+
+    # Archives and resets every server's leaderboard, then schedules the next reset. Called by the bot's scheduler.
+    async def reset_leaderboard(self, when):
+        await self.standings.reset(when)
+        print("Wordle leaderboard reset!")
+        await self.schedule_reset()
 
 # Setups the Cog to be used by the bot.
 async def setup(bot):
@@ -0,0 +1,67 @@
+# Author: Alec Creasy
+# File Name: author_index.py
+# Description: Indexes quotes by author so that finding an author's quotes is a dictionary lookup, and keeps a prefix
+# trie of author names to suggest authors as the user types.
+
+
+# Normalizes an author's name so that lookups ignore case and extra whitespace ("  bob  SMITH" matches "Bob Smith").
+def normalize(author):
+    return " ".join(author.split()).casefold()
+
+
+# A node of the prefix trie. Each node maps the next character to its child node, and key is set if a normalized
+# author name ends at this node.
+class TrieNode:
+    __slots__ = ("children", "key")
+
+    def __init__(self):
+        self.children = {}
+        self.key = None
+
+
+class AuthorIndex:
+    def __init__(self, quotes=()):
+        self.positions = {}  # Normalized author -> positions of their quotes in the quotes list.
+        self.names = {}  # Normalized author -> the name as it was last written when adding a quote.
+        self.root = TrieNode()
+
+        for position, quote in enumerate(quotes):
+            self.add(quote["author"], position)
+
+    # Adds the quote at the given position in the quotes list under its author.
+    def add(self, author, position):
+        key = normalize(author)
+        if not key:
+            return
+
+        if key not in self.positions:
+            self.positions[key] = []
+            node = self.root
+            for character in key:
+                node = node.children.setdefault(character, TrieNode())
+            node.key = key
+
+        self.positions[key].append(position)
+        self.names[key] = " ".join(author.split())
+
+    # Returns the positions of every quote by the given author (an empty list if there are none).
+    def get(self, author):
+        return self.positions.get(normalize(author), [])
+
+    # Returns up to limit author names starting with the given prefix, in alphabetical order.
+    def complete(self, prefix, limit=25):
+        node = self.root
+        for character in normalize(prefix):
+            node = node.children.get(character)
+            if node is None:
+                return []
+
+        # Walk the subtree depth first, visiting children in alphabetical order, until enough names are found.
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            if node.key is not None:
+                results.append(self.names[node.key])
+            stack.extend(node.children[character] for character in sorted(node.children, reverse=True))
+        return results
@@ -0,0 +1,110 @@
+# Author: Alec Creasy
+# File Name: board.py
+# Description: Renders a Wordle game's board as a single embedded message that is edited in place as guesses come in,
+# instead of sending the whole board again for every guess.
+
+import asyncio
+import discord
+from core import dispatcher
+
+# Discord allows up to 4096 characters in an embed's description. The board starts a new message a bit before that to
+# leave room for the footer line.
+DESCRIPTION_LIMIT = 4096
+FOOTER_ROOM = 96
+
+
+class Board:
+    # channel is where the board is sent, outbox is the bot's Dispatcher that the messages go through, title is the
+    # embed title, and delay is how long (in seconds) to wait for more guesses before editing the message, so that
+    # guesses that arrive close together are shown with a single edit.
+    def __init__(self, channel, outbox, title, delay=1.0):
+        self.channel = channel
+        self.outbox = outbox
+        self.title = title
+        self.delay = delay
+        self.rows = []  # The rendered rows shown on the current message.
+        self.length = 0  # The number of characters in the rows on the current message (including newlines).
+        self.footer = ""
+        self.message = None  # The message currently being edited, or None if the next update should send a new one.
+        self.dirty = False  # Whether there are rows or a footer that have not been sent yet.
+        self.flush_task = None
+        self.sleeping = False  # Whether the flush task is still waiting out the delay (and has not started sending).
+        self.closed = False
+        self.lock = asyncio.Lock()
+
+    # Adds a row to the board and updates the footer. The message is updated after the delay. If the row would not fit
+    # on the current message, the current message is brought up to date and the row starts a new message.
+    async def add(self, row, footer):
+        if self.rows and self.length + len(row) + 1 > DESCRIPTION_LIMIT - FOOTER_ROOM:
+            await self.flush()
+            self.rows = []
+            self.length = 0
+            self.message = None
+
+        self.rows.append(row)
+        self.length += len(row) + 1
+        self.footer = footer
+        self.dirty = True
+        self._schedule()
+
+    # Starts a delayed flush, unless one is already waiting or the board has been closed.
+    def _schedule(self):
+        if self.closed:
+            return
+        if self.flush_task is None or self.flush_task.done() or self.flush_task is asyncio.current_task():
+            self.sleeping = True
+            self.flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.sleeping = False
+        await self.flush()
+
+    # Sends or edits the board message so that it shows every row added so far. Does nothing if it is up to date.
+    # Edits are queued without waiting (a queued edit is replaced by the next one if it has not gone out yet) unless
+    # wait is True, which is used for the final board of a game so that it goes out before the result.
+    async def flush(self, wait=False):
+        async with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+
+            description = "\n".join(self.rows)
+            if self.footer:
+                description += f"\n\n{self.footer}"
+            embed = discord.Embed(title=self.title, description=description, color=discord.Color.green())
+
+            if self.message is None:
+                # The message is edited later, which would wipe out any other embeds merged into it. If it cannot be
+                # sent, the rows are kept for the next update instead of failing the guess (or the end of the game).
+                try:
+                    self.message = await self.outbox.send(self.channel, embed, dispatcher.UPDATE, mergeable=False)
+                except discord.HTTPException as error:
+                    print(f"Failed to send the Wordle board: {error}")
+                    self.dirty = True
+                    return
+            else:
+                edit = self.outbox.post_edit(self.message, embed, dispatcher.UPDATE, key=("board", id(self)))
+                edit.add_done_callback(lambda future, message=self.message: self._edit_done(future, message))
+                if wait:
+                    await asyncio.wait([edit])
+
+        # Rows added while the message was being sent have not gone out yet.
+        if self.dirty:
+            self._schedule()
+
+    # If the board message was deleted, the next update sends a new one with every row.
+    def _edit_done(self, future, message):
+        if not future.cancelled() and isinstance(future.exception(), discord.NotFound) and self.message is message:
+            self.message = None
+            self.dirty = True
+            self._schedule()
+
+    # Stops any pending update. Used when the game ends, before the final board is flushed. A flush that is already
+    # sending is left to finish, so that the message it sends is the one the final flush edits.
+    def close(self):
+        self.closed = True
+        if self.flush_task and self.sleeping and self.flush_task is not asyncio.current_task():
+            self.flush_task.cancel()
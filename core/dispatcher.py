@@ -0,0 +1,216 @@
+# Author: Alec Creasy
+# File Name: dispatcher.py
+# Description: Sends the bot's messages through a queue per channel. Each channel's queue is ordered by priority (game
+# results go out before validation errors), paced to stay within Discord's per-channel rate limit, and while messages
+# wait, queued embeds are merged into a single message and updates that were superseded (such as a stale board edit)
+# are dropped.
+
+import asyncio
+import heapq
+from itertools import count
+from time import monotonic
+
+# Message priorities. Lower values are sent first.
+RESULT = 0  # Game results (wins, timeouts).
+UPDATE = 1  # Boards and reminders.
+ERROR = 2  # Validation errors ("not a valid word", "already guessed").
+
+# Discord allows up to 10 embeds per message, with up to 6000 characters across all of them.
+MAX_EMBEDS = 10
+MAX_EMBED_CHARACTERS = 6000
+
+
+# A queued message: either embeds to send to the channel, or an embed to replace an existing message's embed with.
+class Outgoing:
+    __slots__ = ("embed", "message", "key", "mergeable", "future")
+
+    def __init__(self, embed, message=None, key=None, mergeable=True):
+        self.embed = embed
+        self.message = message  # The message to edit, or None to send a new message.
+        self.key = key
+        # Whether the embed can share a message with other embeds. Messages that will be edited later must not be
+        # shared, since an edit replaces every embed on the message.
+        self.mergeable = mergeable and message is None
+        self.future = asyncio.get_running_loop().create_future()
+
+
+# A token bucket that allows a burst of messages to a channel, and then one every refill seconds.
+class TokenBucket:
+    def __init__(self, burst, refill):
+        self.tokens = burst
+        self.burst = burst
+        self.refill = refill
+        self.updated = monotonic()
+
+    # Adds the tokens that have refilled since the last update.
+    def _refresh(self):
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.refill)
+        self.updated = now
+
+    # Returns how long (in seconds) until the bucket is full again.
+    def time_to_full(self):
+        self._refresh()
+        return (self.burst - self.tokens) * self.refill
+
+    # Waits until the channel is allowed another message, then uses up a token.
+    async def acquire(self):
+        while True:
+            self._refresh()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) * self.refill)
+
+
+# The queue of a single channel.
+class ChannelQueue:
+    def __init__(self, channel, bucket):
+        self.channel = channel
+        self.bucket = bucket
+        self.heap = []  # (priority, sequence number, Outgoing)
+        self.keys = {}  # Key -> the queued Outgoing with that key.
+        self.task = None
+
+
+class Dispatcher:
+    # burst and refill are the per-channel rate limit: up to burst messages at once, then one every refill seconds.
+    def __init__(self, burst=5, refill=1.0):
+        self.burst = burst
+        self.refill = refill
+        self.queues = {}  # Channel ID -> ChannelQueue, only for channels with messages waiting.
+        # Channel ID -> TokenBucket. A channel's bucket is kept after its queue empties, until it has refilled, so that
+        # messages sent one after another are still paced.
+        self.buckets = {}
+        self.sequence = count()
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+
+    # Queues an embed to be sent to the channel and returns a future for the message it was sent in. If a key is given,
+    # a queued message with the same key that has not been sent yet is dropped in favour of this one. If mergeable is
+    # False, the embed is sent in a message of its own (used for messages that are edited later).
+    def post(self, channel, embed, priority=UPDATE, key=None, mergeable=True):
+        return self._enqueue(channel, Outgoing(embed, key=key, mergeable=mergeable), priority)
+
+    # Queues an edit that replaces the message's embed. Edits with the same key supersede each other the same way.
+    def post_edit(self, message, embed, priority=UPDATE, key=None):
+        return self._enqueue(message.channel, Outgoing(embed, message, key), priority)
+
+    # Sends an embed through the channel's queue and waits until it has been sent. Returns the message.
+    async def send(self, channel, embed, priority=UPDATE, key=None, mergeable=True):
+        return await self.post(channel, embed, priority, key, mergeable)
+
+    def _enqueue(self, channel, outgoing, priority):
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            bucket = self.buckets.get(channel.id)
+            if bucket is None:
+                bucket = self.buckets[channel.id] = TokenBucket(self.burst, self.refill)
+            queue = self.queues[channel.id] = ChannelQueue(channel, bucket)
+
+        if outgoing.key is not None:
+            stale = queue.keys.get(outgoing.key)
+            if stale is not None:
+                # The old message will never be sent, so whoever is waiting on it gets the result of the new one.
+                stale.key = None
+                stale.embed = None
+                self.dropped += 1
+                outgoing.future.add_done_callback(lambda future, stale=stale: self._chain(future, stale.future))
+            queue.keys[outgoing.key] = outgoing
+
+        heapq.heappush(queue.heap, (priority, next(self.sequence), outgoing))
+        outgoing.future.add_done_callback(self._log_failure)
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._drain(queue))
+        return outgoing.future
+
+    @staticmethod
+    def _chain(source, target):
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Failed to send message: {future.exception()!r}")
+
+    # Takes the next batch off the queue: a single edit or unmergeable message, or as many new embeds (in priority
+    # order) as fit in one message.
+    def _next_batch(self, queue):
+        batch = []
+        characters = 0
+        while queue.heap:
+            _, _, outgoing = queue.heap[0]
+            if outgoing.embed is None or outgoing.future.cancelled():  # Superseded, or no longer wanted.
+                heapq.heappop(queue.heap)
+                if outgoing.key is not None and queue.keys.get(outgoing.key) is outgoing:
+                    del queue.keys[outgoing.key]
+                continue
+            if not outgoing.mergeable:
+                if not batch:
+                    heapq.heappop(queue.heap)
+                    batch.append(outgoing)
+                break
+            if len(batch) == MAX_EMBEDS or characters + len(outgoing.embed) > MAX_EMBED_CHARACTERS:
+                break
+            heapq.heappop(queue.heap)
+            batch.append(outgoing)
+            characters += len(outgoing.embed)
+
+        for outgoing in batch:
+            if outgoing.key is not None and queue.keys.get(outgoing.key) is outgoing:
+                del queue.keys[outgoing.key]
+        return batch
+
+    # Sends everything in the channel's queue, waiting for the rate limit between messages. Messages that are queued
+    # while it waits get merged into the next message.
+    async def _drain(self, queue):
+        try:
+            while queue.heap:
+                await queue.bucket.acquire()
+                batch = self._next_batch(queue)
+                if not batch:
+                    continue
+
+                try:
+                    if batch[0].message is not None:
+                        result = await batch[0].message.edit(embed=batch[0].embed)
+                    else:
+                        result = await queue.channel.send(embeds=[outgoing.embed for outgoing in batch])
+                except Exception as error:
+                    for outgoing in batch:
+                        if not outgoing.future.done():
+                            outgoing.future.set_exception(error)
+                    continue
+
+                self.sent += 1
+                self.merged += len(batch) - 1
+                for outgoing in batch:
+                    if not outgoing.future.done():
+                        outgoing.future.set_result(result)
+        finally:
+            if not queue.heap and self.queues.get(queue.channel.id) is queue:
+                del self.queues[queue.channel.id]
+                asyncio.get_running_loop().call_later(queue.bucket.time_to_full(), self._forget_bucket,
+                                                      queue.channel.id, queue.bucket)
+
+    # Forgets a channel's bucket once it is full again (a new one would be the same), unless the channel is busy.
+    def _forget_bucket(self, channel_id, bucket):
+        if channel_id in self.queues or self.buckets.get(channel_id) is not bucket:
+            return
+        delay = bucket.time_to_full()
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._forget_bucket, channel_id, bucket)
+        else:
+            del self.buckets[channel_id]
+
+    # Returns the dispatcher's counters.
+    def stats(self):
+        return {"queued_channels": len(self.queues), "sent": self.sent, "merged": self.merged, "dropped": self.dropped}
@@ -0,0 +1,180 @@
+# Author: Alec Creasy
+# File Name: feedback.py
+# Description: Precomputes the Wordle feedback (green/yellow/black) for every answer and valid guess pair and stores
+# it in a memory-mapped matrix on disk, so that scoring a guess is a single lookup.
+
+import mmap
+import os
+import struct
+
+# Each square in a feedback pattern is stored as a base 3 digit (0 = black, 1 = yellow, 2 = green), with the first
+# letter being the least significant digit. A 5 letter pattern therefore fits in a single byte (3^5 = 243), which is
+# what the matrix stores. Patterns for words of up to 7 letters can be scored directly.
+BLACK, YELLOW, GREEN = 0, 1, 2
+POWERS = (1, 3, 9, 27, 81, 243, 729)
+SQUARES = (":black_large_square:", ":yellow_square:", ":green_square:")
+
+# The matrix file starts with a header of the magic bytes, the format version, the number of answers (rows), the
+# number of guesses (columns) and a fingerprint of the word list files that the matrix was built from.
+MAGIC = b"WFBM"
+VERSION = 1
+HEADER = struct.Struct("<4sHII32s")
+
+
+# Scores a guess against the answer and returns the feedback pattern code. Greens are handed out first, then yellows
+# are handed out left to right for as long as the answer still has unmatched copies of that letter.
+def score_guess(answer, guess):
+    code = 0
+    remaining = list(answer)
+
+    for i, letter in enumerate(guess):
+        if letter == answer[i]:
+            code += GREEN * POWERS[i]
+            remaining[i] = None
+
+    for i, letter in enumerate(guess):
+        if letter != answer[i] and letter in remaining:
+            code += YELLOW * POWERS[i]
+            remaining[remaining.index(letter)] = None
+
+    return code
+
+
+# Splits a pattern code back into its list of squares (one per letter).
+def decode(code, length=5):
+    digits = []
+    for _ in range(length):
+        digits.append(code % 3)
+        code //= 3
+    return digits
+
+
+# Renders a pattern code as the emoji squares used in the game's embeds.
+def render(code, length=5):
+    return " ".join(SQUARES[digit] for digit in decode(code, length))
+
+
+# Computes one row of the matrix (every guess scored against a single answer). If a guess has no repeated letters,
+# a letter that is not green is yellow exactly when it appears anywhere in the answer, so those guesses are scored with
+# a per-position lookup table. Guesses with repeated letters fall back to score_guess.
+def _build_row(answer, guesses, distinct):
+    letters = set(answer)
+    tables = []
+    for i, power in enumerate(POWERS[:5]):
+        table = {chr(c): (YELLOW * power if chr(c) in letters else 0) for c in range(ord("a"), ord("z") + 1)}
+        table[answer[i]] = GREEN * power
+        tables.append(table)
+    t0, t1, t2, t3, t4 = tables
+
+    return bytes([t0[g[0]] + t1[g[1]] + t2[g[2]] + t3[g[3]] + t4[g[4]] if simple else score_guess(answer, g)
+                  for g, simple in zip(guesses, distinct)])
+
+
+# Builds the full matrix and writes it to the given path. The matrix is written to a temporary file first and then
+# moved into place so that a crash mid-build never leaves a half written matrix behind. This is a plain function (not
+# a method) so that it can be run in a separate process.
+def build_matrix(path, answers, guesses, source_fingerprint):
+    distinct = [len(set(guess)) == len(guess) for guess in guesses]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(answers), len(guesses), source_fingerprint))
+        for answer in answers:
+            file.write(_build_row(answer, guesses, distinct))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_path, path)
+
+
+# The memory-mapped feedback matrix. Rows are answers and columns are valid guesses, both in the order they appear in
+# the word list files. Lookups for words that are not in the matrix return None, and the caller falls back to
+# score_guess.
+class FeedbackMatrix:
+    def __init__(self, path, answers, guesses):
+        self.path = path
+        self.answers = {word: i for i, word in enumerate(answers)}
+        self.guesses = {word: i for i, word in enumerate(guesses)}
+        self._file = None
+        self._map = None
+
+    # Opens and maps the matrix file if it exists and matches the given fingerprint and word lists. Returns whether
+    # the matrix is ready to be used. A stale or damaged file is simply ignored so that it gets rebuilt.
+    def open(self, source_fingerprint):
+        self.close()
+        if not os.path.exists(self.path):
+            return False
+
+        file = open(self.path, "rb")
+        try:
+            header = file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                file.close()
+                return False
+
+            magic, version, rows, columns, stored_fingerprint = HEADER.unpack(header)
+            expected_size = HEADER.size + rows * columns
+            if (magic != MAGIC or version != VERSION or stored_fingerprint != source_fingerprint
+                    or rows != len(self.answers) or columns != len(self.guesses)
+                    or os.fstat(file.fileno()).st_size != expected_size):
+                file.close()
+                return False
+
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._file = file
+            return True
+        except (OSError, ValueError):
+            file.close()
+            return False
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def ready(self):
+        return self._map is not None
+
+    # Returns the pattern code for the answer and guess, or None if either is not in the matrix.
+    def lookup(self, answer, guess):
+        if self._map is None:
+            return None
+        row = self.answers.get(answer)
+        column = self.guesses.get(guess)
+        if row is None or column is None:
+            return None
+        return self._map[HEADER.size + row * len(self.guesses) + column]
+
+    # Returns a read-only view of every guess's pattern code for a single answer, in word list order. Batch features
+    # (replaying games, scoring a backlog of guesses) can work on the whole row at once instead of scoring per guess.
+    def row(self, answer):
+        if self._map is None or answer not in self.answers:
+            return None
+        start = HEADER.size + self.answers[answer] * len(self.guesses)
+        return memoryview(self._map)[start:start + len(self.guesses)]
+
+    # Scores a guess, using the matrix when possible and falling back to computing it directly.
+    def score(self, answer, guess):
+        code = self.lookup(answer, guess)
+        return score_guess(answer, guess) if code is None else code
+
+
+# Allows prebuilding the matrix from the command line (python -m core.feedback) so that the bot does not have to build
+# it in the background the first time it starts.
+if __name__ == "__main__":
+    from configparser import ConfigParser
+    from core import wordlist
+
+    config = ConfigParser()
+    config.read("./config.ini")
+    answer_file = config.get("Wordle", "ANSWER_FILE")
+    valid_file = config.get("Wordle", "VALID_FILE")
+    matrix_file = config.get("Wordle", "FEEDBACK_FILE")
+
+    index = wordlist.load(answer_file, valid_file, config.get("Wordle", "WORDS_CACHE", fallback=None))
+    build_matrix(matrix_file, index.answers, index.guesses, wordlist.fingerprint(answer_file, valid_file))
+    print(f"Feedback matrix written to {matrix_file} ({len(index.answers)} x {len(index.guesses)})")
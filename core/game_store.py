@@ -0,0 +1,81 @@
+# Author: Alec Creasy
+# File Name: game_store.py
+# Description: Saves the running Wordle games to an SQLite database so that they survive a restart. Each change (a game
+# starting, a guess, a game ending) is queued and written behind, and every change within a short window is written in
+# one transaction. At startup, every saved game is read back as a snapshot in two queries. When the bot runs as several
+# worker processes, each one only restores the games in the servers on its own shards.
+
+import json
+import sqlite3
+from core.sharding import Partition
+from core.sqlite_store import SQLiteStore
+from core.stores import GameStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (channel_id INTEGER PRIMARY KEY, answer TEXT, start_time REAL, points TEXT,
+                                  guild_id INTEGER);
+CREATE TABLE IF NOT EXISTS attempts (channel_id INTEGER, number INTEGER, mention TEXT, guess TEXT, row TEXT,
+                                     PRIMARY KEY (channel_id, number));
+"""
+
+
+class GameStore(SQLiteStore, GameStorage):
+    # partition is the set of servers this process is responsible for (every server by default).
+    def __init__(self, path, flush_delay=0.5, partition=None):
+        super().__init__(path, flush_delay)
+        self.partition = partition or Partition()
+        self.pending = []  # (statement, parameters) to run with the next flush, in order.
+
+    # Opens (or creates) the database and returns a snapshot of every saved game in the servers this process is
+    # responsible for, by channel ID. The snapshots are in the format used by GameInstance.snapshot.
+    def open(self):
+        self.connect(SCHEMA)
+
+        snapshots = {}
+        for channel_id, answer, start_time, points, guild_id in self.connection.execute("SELECT channel_id, answer, start_time, points, guild_id FROM games"):
+            if not self.partition.owns(guild_id):
+                continue
+            snapshots[channel_id] = {"answer": answer, "start_time": start_time, "points_available": json.loads(points),
+                                     "attempts": []}
+        for channel_id, mention, guess, row in self.connection.execute("SELECT channel_id, mention, guess, row FROM attempts ORDER BY channel_id, number"):
+            if channel_id in snapshots:
+                snapshots[channel_id]["attempts"].append((mention, guess, row))
+        return snapshots
+
+    # Queues a new game in the given server to be saved.
+    def start(self, channel_id, guild_id, snapshot):
+        self._queue("DELETE FROM attempts WHERE channel_id = ?", (channel_id,))
+        self._queue("INSERT OR REPLACE INTO games (channel_id, answer, start_time, points, guild_id) VALUES (?, ?, ?, ?, ?)",
+                    (channel_id, snapshot["answer"], snapshot["start_time"], json.dumps(snapshot["points_available"]),
+                     guild_id))
+
+    # Queues a guess to be saved: the attempt is added and the points that are still available are updated.
+    def guess(self, channel_id, number, attempt, points_available):
+        self._queue("INSERT OR REPLACE INTO attempts (channel_id, number, mention, guess, row) VALUES (?, ?, ?, ?, ?)",
+                    (channel_id, number, *attempt))
+        self._queue("UPDATE games SET points = ? WHERE channel_id = ?", (json.dumps(points_available), channel_id))
+
+    # Queues a finished game to be removed.
+    def end(self, channel_id):
+        self._queue("DELETE FROM games WHERE channel_id = ?", (channel_id,))
+        self._queue("DELETE FROM attempts WHERE channel_id = ?", (channel_id,))
+
+    def _queue(self, statement, parameters):
+        self.pending.append((statement, parameters))
+        self.schedule_flush()
+
+    # Writes every queued change in a single transaction.
+    async def flush(self):
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        try:
+            await self.write(self._apply, batch)
+        except sqlite3.Error as error:
+            self.pending[:0] = batch  # Retry these with the next flush.
+            print(f"Failed to save {len(batch)} Wordle game changes: {error}")
+
+    def _apply(self, batch):
+        for statement, parameters in batch:
+            self.connection.execute(statement, parameters)
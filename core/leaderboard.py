@@ -0,0 +1,141 @@
+# Author: Alec Creasy
+# File Name: leaderboard.py
+# Description: Keeps the Wordle leaderboard for each server, ordered by score so that the top players and a player's
+# rank can be found without sorting, and saves it to an SQLite database with batched writes. At the weekly reset, the
+# standings are archived before the scores are cleared. When the bot runs as several worker processes, each one only
+# loads, resets, and writes the leaderboards of the servers on its own shards.
+
+import sqlite3
+from datetime import datetime, timezone
+from core.sharding import Partition
+from core.skiplist import SkipList
+from core.sqlite_store import SQLiteStore
+from core.stores import LeaderboardStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (guild_id INTEGER, user_id INTEGER, score INTEGER, PRIMARY KEY (guild_id, user_id));
+CREATE TABLE IF NOT EXISTS archive (week TEXT, guild_id INTEGER, user_id INTEGER, score INTEGER, rank INTEGER);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+# The leaderboard of a single server. The ranking is a skiplist of (-score, user ID) pairs kept in sorted order, so the
+# highest scores come first, and updating a score, finding a rank, and finding a page all take O(log n) time.
+class Leaderboard:
+    def __init__(self, scores=None):
+        self.scores = dict(scores or {})  # User ID -> score.
+        self.ranking = SkipList((-score, user_id) for user_id, score in self.scores.items())
+
+    def __len__(self):
+        return len(self.ranking)
+
+    # Adds points to the user's score (adding the user if they are not on the leaderboard yet) and returns the new
+    # score.
+    def add(self, user_id, points):
+        old_score = self.scores.get(user_id)
+        if old_score is not None:
+            self.ranking.remove((-old_score, user_id))
+
+        new_score = (old_score or 0) + points
+        self.scores[user_id] = new_score
+        self.ranking.add((-new_score, user_id))
+        return new_score
+
+    # Returns up to count (user ID, score) pairs, starting at the given position (0 is the top of the leaderboard).
+    def top(self, count, start=0):
+        return [(user_id, -score) for score, user_id in self.ranking.slice(start, count)]
+
+    # Returns the user's rank (1 is first place, and tied players share a rank), or None if they are not on the
+    # leaderboard.
+    def rank(self, user_id):
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.ranking.index((-score,)) + 1
+
+
+class LeaderboardStore(SQLiteStore, LeaderboardStorage):
+    # partition is the set of servers this process is responsible for (every server by default).
+    def __init__(self, path, flush_delay=5.0, partition=None):
+        super().__init__(path, flush_delay)
+        self.partition = partition or Partition()
+        self.guilds = {}  # Guild ID -> Leaderboard.
+        self.dirty = set()  # (guild ID, user ID) pairs with scores that have not been written yet.
+        self.last_reset = None  # Unix timestamp of the last reset, or None if the leaderboard has never been reset.
+
+    # Opens (or creates) the database and loads the leaderboard of every server this process is responsible for, and
+    # the time of the last reset.
+    def open(self):
+        self.connect(SCHEMA)
+
+        # Each shard records its own last reset. A shard that has never been reset by itself (the bot used to run as a
+        # single process) goes by the last reset of the whole leaderboard.
+        resets = dict(self.connection.execute("SELECT key, value FROM meta WHERE key LIKE 'last_reset%'").fetchall())
+        times = [resets.get(key, resets.get("last_reset")) for key in self._reset_keys()]
+        self.last_reset = None if None in times else min(float(value) for value in times)
+
+        scores = {}
+        for guild_id, user_id, score in self.connection.execute("SELECT guild_id, user_id, score FROM scores"):
+            if self.partition.owns(guild_id):
+                scores.setdefault(guild_id, {})[user_id] = score
+        self.guilds = {guild_id: Leaderboard(guild_scores) for guild_id, guild_scores in scores.items()}
+
+    # Returns the leaderboard for the given server, creating an empty one if it does not have one yet.
+    def get(self, guild_id):
+        leaderboard = self.guilds.get(guild_id)
+        if leaderboard is None:
+            leaderboard = self.guilds[guild_id] = Leaderboard()
+        return leaderboard
+
+    # Adds points to a user's score in the given server. The new score is written with the next flush.
+    def add(self, guild_id, user_id, points):
+        self.get(guild_id).add(user_id, points)
+        self.dirty.add((guild_id, user_id))
+        self.schedule_flush()
+
+    # Writes the scores of every user whose score changed since the last flush in a single transaction.
+    async def flush(self):
+        if not self.dirty:
+            return
+
+        changed, self.dirty = self.dirty, set()
+        rows = [(guild_id, user_id, self.guilds[guild_id].scores[user_id]) for guild_id, user_id in changed
+                if guild_id in self.guilds and user_id in self.guilds[guild_id].scores]
+        try:
+            await self.write(self._upsert, rows)
+        except sqlite3.Error as error:
+            self.dirty |= changed  # Retry these with the next flush.
+            print(f"Failed to save {len(rows)} leaderboard scores: {error}")
+
+    def _upsert(self, rows):
+        self.connection.executemany("INSERT INTO scores (guild_id, user_id, score) VALUES (?, ?, ?) "
+                                    "ON CONFLICT (guild_id, user_id) DO UPDATE SET score = excluded.score", rows)
+
+    # The meta keys that the time of the last reset is stored under: one per shard when running as several processes.
+    def _reset_keys(self):
+        if not self.partition.sharded:
+            return ["last_reset"]
+        return [f"last_reset:{shard_id}" for shard_id in sorted(self.partition.shard_ids)]
+
+    # Archives every server's standings under the time of the reset (a Unix timestamp) and clears the scores, all in
+    # one transaction.
+    async def reset(self, when):
+        week = datetime.fromtimestamp(when, timezone.utc).isoformat()
+        archived = [(week, guild_id, user_id, score, leaderboard.rank(user_id))
+                    for guild_id, leaderboard in self.guilds.items()
+                    for user_id, score in leaderboard.top(len(leaderboard))]
+        guild_ids = list(self.guilds)
+        self.guilds = {}
+        self.dirty = set()
+        self.last_reset = when
+        await self.write(self._archive, archived, guild_ids, when)
+
+    def _archive(self, archived, guild_ids, when):
+        self.connection.executemany("INSERT INTO archive (week, guild_id, user_id, score, rank) VALUES (?, ?, ?, ?, ?)",
+                                    archived)
+        if self.partition.sharded:
+            self.connection.executemany("DELETE FROM scores WHERE guild_id = ?", [(guild_id,) for guild_id in guild_ids])
+        else:
+            self.connection.execute("DELETE FROM scores")
+        self.connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                    [(key, str(when)) for key in self._reset_keys()])
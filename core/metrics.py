@@ -0,0 +1,198 @@
+# Author: Alec Creasy
+# File Name: metrics.py
+# Description: Records how the bot is performing: latency histograms for every command, listener, and REST route,
+# an event loop lag sampler, and counters (REST calls, rate limits, errors). The metrics can be shown with /stats or
+# served in the Prometheus text format on a local port.
+
+import asyncio
+import logging
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from time import perf_counter
+
+import discord
+from discord.app_commands import CheckFailure, CommandTree
+
+# Histogram bucket upper bounds, in seconds. Anything slower than the last bound goes in a final overflow bucket.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# A fixed bucket latency histogram. Recording a value is a binary search and an increment, so it is cheap enough to do
+# on every event.
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    # Estimates the given percentile (0 to 1) as the upper bound of the bucket it falls in. Returns infinity if it is
+    # in the overflow bucket.
+    def percentile(self, fraction):
+        target = fraction * self.count
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += bucket_count
+            if seen >= target and seen:
+                return bound
+        return 0.0
+
+
+# Counts warnings from discord.py's HTTP client that say a request was rate limited.
+class RateLimitHandler(logging.Handler):
+    def __init__(self, metrics):
+        super().__init__(logging.WARNING)
+        self.metrics = metrics
+
+    def emit(self, record):
+        if "rate limit" in record.getMessage().lower():
+            self.metrics.increment("rate_limits")
+
+
+class Metrics:
+    def __init__(self, lag_interval=0.5):
+        self.histograms = {}  # (kind, name) -> Histogram, where kind is "command", "listener", "rest", or "loop".
+        self.counters = {}  # Name -> count.
+        self.lag_interval = lag_interval
+        self.lag_task = None
+        self.server = None
+
+    def observe(self, kind, name, value):
+        histogram = self.histograms.get((kind, name))
+        if histogram is None:
+            histogram = self.histograms[(kind, name)] = Histogram()
+        histogram.observe(value)
+
+    def increment(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Times the body of an async with block and records it under the given kind and name.
+    @asynccontextmanager
+    async def timed(self, kind, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, perf_counter() - start)
+
+    # Hooks the metrics into the bot: app commands are timed from the tree's interaction check until they complete (or
+    # fail), every REST request is counted and timed by route, and rate limit warnings are counted. Listeners are timed
+    # where they are dispatched (see MessageRouter).
+    def install(self, bot):
+        self.bot = bot
+
+        async def interaction_check(interaction):
+            interaction.extras["metrics_start"] = perf_counter()
+            return True
+
+        async def on_app_command_completion(interaction, command):
+            self._observe_command(interaction, command)
+
+        # Commands the user is not allowed to run (such as /stats for non-administrators) get an ephemeral reply instead of
+        # leaving the interaction unanswered. Every other error is logged.
+        async def on_app_command_error(interaction, error):
+            self._observe_command(interaction, interaction.command)
+            self.increment("command_errors")
+            if isinstance(error, CheckFailure):
+                message = str(error) or "You cannot use this command."
+                try:
+                    if interaction.response.is_done():
+                        await interaction.followup.send(message, ephemeral=True)
+                    else:
+                        await interaction.response.send_message(message, ephemeral=True)
+                except discord.HTTPException as failure:
+                    print(f"Failed to respond to a check failure: {failure}")
+                return
+            await CommandTree.on_error(bot.tree, interaction, error)
+
+        bot.tree.interaction_check = interaction_check
+        bot.tree.error(on_app_command_error)
+        bot.add_listener(on_app_command_completion, "on_app_command_completion")
+
+        request = bot.http.request
+
+        async def timed_request(route, **kwargs):
+            self.increment("rest_calls")
+            start = perf_counter()
+            try:
+                return await request(route, **kwargs)
+            finally:
+                self.observe("rest", f"{route.method} {route.path}", perf_counter() - start)
+
+        bot.http.request = timed_request
+        logging.getLogger("discord.http").addHandler(RateLimitHandler(self))
+
+    def _observe_command(self, interaction, command):
+        start = interaction.extras.get("metrics_start")
+        if start is not None and command is not None:
+            self.observe("command", f"/{command.qualified_name}", perf_counter() - start)
+
+    # Starts sampling event loop lag: how much later than asked the loop wakes up from a sleep. Anything blocking the
+    # loop (for example, file I/O or heavy computation in a handler) shows up here.
+    def start_lag_monitor(self):
+        if self.lag_task is None or self.lag_task.done():
+            self.lag_task = asyncio.create_task(self._sample_lag())
+
+    async def _sample_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            self.observe("loop", "lag", max(0.0, loop.time() - start - self.lag_interval))
+
+    # Returns a summary of every histogram as (kind, name, count, mean, p50, p99) rows, slowest p99 first.
+    def summary(self):
+        rows = [(kind, name, histogram.count, histogram.total / histogram.count, histogram.percentile(0.5),
+                 histogram.percentile(0.99)) for (kind, name), histogram in self.histograms.items() if histogram.count]
+        return sorted(rows, key=lambda row: row[5], reverse=True)
+
+    # Renders every metric in the Prometheus text exposition format.
+    def prometheus(self):
+        lines = []
+        for kind in sorted({kind for kind, _ in self.histograms}):
+            metric = f"smitenight_{kind}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (histogram_kind, name), histogram in sorted(self.histograms.items()):
+                if histogram_kind != kind:
+                    continue
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{name="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{name="{label}"}} {histogram.total}')
+                lines.append(f'{metric}_count{{name="{label}"}} {histogram.count}')
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE smitenight_{name}_total counter")
+            lines.append(f"smitenight_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    # Serves the Prometheus text on the given local port. Every request gets the metrics, whatever its path.
+    async def start_server(self, port, host="127.0.0.1"):
+        self.server = await asyncio.start_server(self._serve, host, port)
+
+    async def _serve(self, reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = self.prometheus().encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def stop(self):
+        if self.lag_task:
+            self.lag_task.cancel()
+        if self.server:
+            self.server.close()
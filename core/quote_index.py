@@ -0,0 +1,114 @@
+# Author: Alec Creasy
+# File Name: quote_index.py
+# Description: A full-text inverted index over the text of the quotes, for /quotesearch. Each word maps to the quotes
+# that contain it, and results are ranked with BM25 (quotes that use the searched words more often, and rarer words,
+# rank higher, with long quotes weighed down). The index can be saved to a file so it does not have to be rebuilt on
+# every start.
+
+import json
+import math
+import os
+import re
+from zlib import crc32
+
+VERSION = 1
+
+# BM25 parameters: K1 controls how quickly repeating a word stops adding to the score, and B how much a quote's length
+# counts against it.
+K1 = 1.2
+B = 0.75
+
+WORD = re.compile(r"\w+")
+
+
+# Splits text into lowercase words, ignoring punctuation ("Don't stop!" -> ["don", "t", "stop"]).
+def tokenize(text):
+    return WORD.findall(text.casefold())
+
+
+# A checksum of the text of the first count quotes, used to make sure a saved index matches the quotes it was built
+# from. This is much cheaper than tokenizing them again.
+def _check(quotes, count):
+    check = 0
+    for position in range(count):
+        check = crc32(quotes[position]["quote"].encode(), check)
+    return check
+
+
+class QuoteIndex:
+    def __init__(self, quotes=()):
+        self.postings = {}  # Word -> [[position in the quotes list, times the word appears in that quote], ...]
+        self.lengths = []  # The number of words in each quote, by position.
+        self.total_length = 0
+
+        for position, quote in enumerate(quotes):
+            self.add(quote["quote"], position)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    # Adds the quote at the given position in the quotes list. Quotes are added in order, so each word's postings stay
+    # sorted by position.
+    def add(self, text, position):
+        words = tokenize(text)
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        for word, count in counts.items():
+            self.postings.setdefault(word, []).append([position, count])
+
+        while len(self.lengths) < position:  # Positions that were skipped (should not happen) count as empty quotes.
+            self.lengths.append(0)
+        self.lengths.append(len(words))
+        self.total_length += len(words)
+
+    # Returns the positions of every quote containing at least one of the words in the query, best match first (newer
+    # quotes first when the scores are equal).
+    def search(self, query):
+        if not self.lengths:
+            return []
+
+        count = len(self.lengths)
+        average_length = self.total_length / count or 1
+        scores = {}
+        for word in set(tokenize(query)):
+            postings = self.postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = K1 * (1 - B + B * self.lengths[position] / average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+
+        return sorted(scores, key=lambda position: (-scores[position], -position))
+
+    # Saves the index to the given file. The quotes list is used to record which quotes the index covers.
+    def save(self, path, quotes):
+        data = {"version": VERSION, "count": len(self.lengths), "check": _check(quotes, len(self.lengths)),
+                "lengths": self.lengths, "postings": self.postings}
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    # Loads the index for the quotes list from the given file. The saved index is used if it covers a prefix of the
+    # quotes (quotes are only ever appended), and the quotes added since it was saved are indexed on top of it. If the
+    # file is missing or does not match the quotes, the index is rebuilt from scratch.
+    @classmethod
+    def load(cls, path, quotes):
+        if path and os.path.exists(path):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+                count = data["count"]
+                if data["version"] == VERSION and count <= len(quotes) and data["check"] == _check(quotes, count):
+                    index = cls()
+                    index.postings = data["postings"]
+                    index.lengths = data["lengths"]
+                    index.total_length = sum(index.lengths)
+                    for position in range(count, len(quotes)):
+                        index.add(quotes[position]["quote"], position)
+                    return index
+            except (OSError, ValueError, KeyError, TypeError) as error:
+                print(f"Could not load the quote index from {path}: {error}")
+        return cls(quotes)
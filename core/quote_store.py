@@ -0,0 +1,101 @@
+# Author: Alec Creasy
+# File Name: quote_store.py
+# Description: Stores quotes in an SQLite database (in WAL mode). New quotes are written behind the command that added
+# them: adds are queued, and every add within a short window is written by a background thread in one transaction.
+# When the bot runs as several worker processes, they share the database, and each one picks up the quotes added by
+# the others with refresh.
+
+import json
+import os
+import sqlite3
+from core.sqlite_store import SQLiteStore
+from core.stores import QuoteStorage
+
+# The columns of a quote, in the same order as the quote dictionaries used by the Quotes cog.
+COLUMNS = ("submitter_id", "author", "quote")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (id INTEGER PRIMARY KEY, submitter_id INTEGER, author TEXT, quote TEXT);
+"""
+
+
+class QuoteStore(SQLiteStore, QuoteStorage):
+    # path is the database file, legacy_file is the old quotes.json file to import from (if any), and flush_delay is
+    # how long (in seconds) to wait for more adds before writing.
+    def __init__(self, path, legacy_file=None, flush_delay=0.5):
+        super().__init__(path, flush_delay)
+        self.legacy_file = legacy_file
+        self.pending = []
+        self.last_id = 0  # The ID of the newest quote read from the database.
+        self.own_ids = set()  # IDs of quotes this process wrote that have not been passed by refresh yet.
+
+    # Opens (or creates) the database and returns every stored quote in the order they were added. If the database is
+    # empty and a legacy quotes.json file exists, the quotes from it are imported first.
+    def open(self):
+        self.connect(SCHEMA)
+
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            self._import_legacy()
+
+        rows = self.connection.execute("SELECT id, submitter_id, author, quote FROM quotes ORDER BY id").fetchall()
+        self.own_ids.clear()
+        if rows:
+            self.last_id = rows[-1][0]
+        return [dict(zip(COLUMNS, row[1:])) for row in rows]
+
+    # Imports the quotes from the legacy file if the database is empty. Worker processes may open a new database at
+    # the same time, so the check and the import are made in one transaction that holds the write lock from the start
+    # (BEGIN IMMEDIATE): whichever process gets the lock first imports the quotes, and the others see them.
+    def _import_legacy(self):
+        with open(self.legacy_file) as file:
+            legacy_quotes = json.load(file)
+
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            if self.connection.execute("SELECT EXISTS (SELECT 1 FROM quotes)").fetchone()[0]:
+                return
+            self._insert(legacy_quotes)
+        print(f"Imported {len(legacy_quotes)} quotes from {self.legacy_file}")
+
+    # Returns the quotes that other processes added to the database since it was last read, in the order they were
+    # added. Quotes written by this process are skipped, since they are already in its quotes list.
+    async def refresh(self):
+        return await self.run(self._refresh)
+
+    def _refresh(self):
+        rows = self.connection.execute("SELECT id, submitter_id, author, quote FROM quotes WHERE id > ? ORDER BY id",
+                                       (self.last_id,)).fetchall()
+        quotes = []
+        for row in rows:
+            if row[0] in self.own_ids:
+                self.own_ids.discard(row[0])
+            else:
+                quotes.append(dict(zip(COLUMNS, row[1:])))
+        if rows:
+            self.last_id = rows[-1][0]
+        return quotes
+
+    # Queues a quote to be written. This returns immediately; the quote is written (along with any other quotes added
+    # within flush_delay seconds) by the flush task.
+    def add(self, quote):
+        self.pending.append(quote)
+        self.schedule_flush()
+
+    # Writes every queued quote in a single transaction.
+    async def flush(self):
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        try:
+            await self.write(self._insert, batch)
+        except sqlite3.Error as error:
+            # Put the quotes back at the front of the queue so they are retried with the next flush.
+            self.pending[:0] = batch
+            print(f"Failed to save {len(batch)} quotes: {error}")
+
+    def _insert(self, batch):
+        for quote in batch:
+            cursor = self.connection.execute("INSERT INTO quotes (submitter_id, author, quote) VALUES (?, ?, ?)",
+                                             tuple(quote[column] for column in COLUMNS))
+            self.own_ids.add(cursor.lastrowid)
@@ -0,0 +1,44 @@
+# Author: Alec Creasy
+# File Name: router.py
+# Description: Routes messages to the cogs that are interested in them by channel ID. Cogs register a handler for a
+# channel (for example, while a game is running in it), and every message sent in any other channel is dropped with a
+# single dictionary lookup.
+
+
+class MessageRouter:
+    # If metrics are given, every handler call is timed and recorded under the handler's name.
+    def __init__(self, metrics=None):
+        self.handlers = {}  # Channel ID -> list of handlers interested in messages from that channel.
+        self.metrics = metrics
+
+    # Registers a coroutine function to be called with every message sent in the given channel.
+    def register(self, channel_id, handler):
+        handlers = self.handlers.setdefault(channel_id, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    # Stops sending messages from the given channel to the handler. Does nothing if the handler was not registered.
+    def unregister(self, channel_id, handler):
+        handlers = self.handlers.get(channel_id)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self.handlers[channel_id]
+
+    # Returns whether any handler is registered for the given channel.
+    def __contains__(self, channel_id):
+        return channel_id in self.handlers
+
+    # Listener for the bot's on_message event. Passes the message to the handlers registered for its channel.
+    async def dispatch(self, message):
+        handlers = self.handlers.get(message.channel.id)
+        if not handlers:
+            return
+
+        # Copy the handlers, since a handler may unregister itself (for example, when a game ends).
+        for handler in tuple(handlers):
+            if self.metrics is None:
+                await handler(message)
+            else:
+                async with self.metrics.timed("listener", handler.__qualname__):
+                    await handler(message)
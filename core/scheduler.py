@@ -0,0 +1,102 @@
+# Author: Alec Creasy
+# File Name: scheduler.py
+# Description: A shared scheduler that runs coroutines at a given time. Every timer lives in one heap that is driven by
+# a single task, instead of each game (or cog) keeping its own sleeping task around.
+
+import asyncio
+import heapq
+from itertools import count
+from time import time
+
+
+# A scheduled call. Cancelling a timer only marks it as cancelled, and the scheduler skips it when it comes up, so
+# cancelling is constant time.
+class Timer:
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.callback = self.args = None  # Drop the references so cancelled timers do not keep games alive.
+
+
+class Scheduler:
+    def __init__(self):
+        self.heap = []  # (when, sequence number, timer), earliest first.
+        self.sequence = count()  # Keeps timers due at the same time in the order they were scheduled.
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.running = set()  # Callbacks that are currently running.
+
+    # Schedules the coroutine function to be called with the given arguments at the given Unix timestamp, and returns
+    # the timer (which can be cancelled). Times are wall clock times so that they can be saved and restored.
+    def call_at(self, when, callback, *args):
+        timer = Timer(when, callback, args)
+        heapq.heappush(self.heap, (when, next(self.sequence), timer))
+
+        # Start the scheduler's task the first time something is scheduled, and wake it up if the new timer is now the
+        # earliest one so that it does not sleep past it.
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        elif self.heap[0][2] is timer:
+            self.wakeup.set()
+        return timer
+
+    # Schedules the coroutine function to be called with the given arguments after delay seconds.
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time() + delay, callback, *args)
+
+    # Returns the number of timers waiting to run (including cancelled timers that have not been skipped yet).
+    def __len__(self):
+        return len(self.heap)
+
+    async def _run(self):
+        while True:
+            # Skip over any cancelled timers at the front of the heap.
+            while self.heap and self.heap[0][2].cancelled:
+                heapq.heappop(self.heap)
+
+            if not self.heap:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            delay = self.heap[0][0] - time()
+            if delay > 0:
+                # Sleep until the earliest timer is due, or until an earlier timer is scheduled.
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            _, _, timer = heapq.heappop(self.heap)
+            if timer.cancelled:
+                continue
+
+            # Run the callback in its own task so that a slow callback does not hold up the timers after it.
+            callback, args = timer.callback, timer.args
+            timer.cancel()
+            task = asyncio.create_task(self._call(callback, args))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    @staticmethod
+    async def _call(callback, args):
+        try:
+            await callback(*args)
+        except Exception as error:
+            print(f"Scheduled task {getattr(callback, '__qualname__', callback)} failed: {error!r}")
+
+    # Stops the scheduler. Timers that have not run yet are dropped.
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        self.heap.clear()
@@ -0,0 +1,46 @@
+# Author: Alec Creasy
+# File Name: sharding.py
+# Description: Helpers for running the bot as several worker processes, each connecting a group of shards. Discord
+# sends every server's events to exactly one shard, so each worker only keeps the per-server state (leaderboards and
+# games) of the servers on its own shards, and the workers share the SQLite databases for everything else.
+
+import asyncio
+import discord
+
+
+# Returns the shard that Discord sends the server's events to.
+def shard_for(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+# Splits the shards between the workers as evenly as possible. Workers that would get no shards are left out.
+def split(shard_count, workers):
+    return [list(range(worker, shard_count, workers)) for worker in range(min(workers, shard_count))]
+
+
+# Returns the number of shards Discord recommends for the bot.
+async def recommended_shards(token):
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shard_count, _, _ = await http.get_bot_gateway()
+        return shard_count
+    finally:
+        await http.close()
+
+
+# The servers a process is responsible for: the ones on its shards. The default (no shards given) is a single process
+# that is responsible for every server.
+class Partition:
+    def __init__(self, shard_ids=None, shard_count=1):
+        self.shard_ids = frozenset(shard_ids) if shard_ids is not None else None
+        self.shard_count = shard_count
+
+    # Whether other processes are running alongside this one (and may change the shared databases).
+    @property
+    def sharded(self):
+        return self.shard_ids is not None
+
+    # Returns whether this process handles the given server.
+    def owns(self, guild_id):
+        return self.shard_ids is None or shard_for(guild_id, self.shard_count) in self.shard_ids
@@ -0,0 +1,113 @@
+# Author: Alec Creasy
+# File Name: skiplist.py
+# Description: A sorted list of keys backed by an indexable skiplist. Adding or removing a key, finding how many keys
+# come before a key, and finding the key at a position all take O(log n) time on average, where a plain sorted list
+# takes O(n) to add or remove a key (every key after it has to be moved).
+
+from random import random
+
+# The most levels a node can have. Each level holds about half the nodes of the one below it, so 20 levels keeps
+# lookups fast for up to about a million keys.
+MAX_LEVEL = 20
+
+
+# A node of the skiplist. next holds the next node on each of the node's levels, and width holds how many positions
+# each of those links skips over.
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+class SkipList:
+    # keys are the keys to start with. Keys must be unique and comparable with each other.
+    def __init__(self, keys=()):
+        self.head = _Node(None, MAX_LEVEL)
+        self.size = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        node = self.head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    # Returns the last node on each level that comes before the key, and how many positions were skipped on each level
+    # to reach it.
+    def _path(self, key):
+        path = [None] * MAX_LEVEL
+        steps = [0] * MAX_LEVEL
+        node = self.head
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            path[level] = node
+        return path, steps
+
+    # Adds the key in its sorted position.
+    def add(self, key):
+        path, steps = self._path(key)
+
+        levels = 1
+        while levels < MAX_LEVEL and random() < 0.5:
+            levels += 1
+        node = _Node(key, levels)
+
+        skipped = 0  # How many positions the new node is past the node before it on the current level.
+        for level in range(levels):
+            before = path[level]
+            node.next[level] = before.next[level]
+            before.next[level] = node
+            node.width[level] = before.width[level] - skipped
+            before.width[level] = skipped + 1
+            skipped += steps[level]
+        for level in range(levels, MAX_LEVEL):
+            path[level].width[level] += 1
+        self.size += 1
+
+    # Removes the key. Raises KeyError if it is not in the list.
+    def remove(self, key):
+        path, _ = self._path(key)
+        node = path[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+
+        for level in range(len(node.next)):
+            before = path[level]
+            before.width[level] += node.width[level] - 1
+            before.next[level] = node.next[level]
+        for level in range(len(node.next), MAX_LEVEL):
+            path[level].width[level] -= 1
+        self.size -= 1
+
+    # Returns the number of keys that come before the key (its position, if it is in the list), like bisect_left.
+    def index(self, key):
+        _, steps = self._path(key)
+        return sum(steps)
+
+    # Returns up to count keys, in order, starting at the given position.
+    def slice(self, start, count):
+        if start >= self.size or count <= 0:
+            return []
+
+        # Find the node at the start position by following the links that do not skip past it.
+        node = self.head
+        remaining = start + 1
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
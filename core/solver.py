@@ -0,0 +1,113 @@
+# Author: Alec Creasy
+# File Name: solver.py
+# Description: Tracks which answers are still possible in a Wordle game using bitsets (one bit per answer), and suggests
+# the next guess that is expected to narrow the answers down the most.
+
+import math
+import random
+from collections import Counter
+from core import feedback
+
+
+class Solver:
+    def __init__(self, answers):
+        self.answers = tuple(answers)
+        self.all = (1 << len(self.answers)) - 1  # Every answer is possible.
+        length = len(self.answers[0]) if self.answers else 5
+
+        # at[i][letter] has a bit set for every answer with that letter at position i, and at_least[letter][n] for every
+        # answer containing the letter at least n times.
+        self.at = [{} for _ in range(length)]
+        self.at_least = {}
+        for bit, answer in enumerate(self.answers):
+            flag = 1 << bit
+            for i, letter in enumerate(answer):
+                self.at[i][letter] = self.at[i].get(letter, 0) | flag
+            for letter, copies in Counter(answer).items():
+                masks = self.at_least.setdefault(letter, [self.all])
+                while len(masks) <= copies:
+                    masks.append(0)
+                for n in range(1, copies + 1):
+                    masks[n] |= flag
+
+    # Returns a bitset of the answers that agree with the feedback pattern for the guess.
+    def constraint(self, guess, pattern):
+        mask = self.all
+        squares = feedback.decode(pattern, len(guess))
+        marked = Counter()  # Green and yellow squares per letter.
+        blacked = set()  # Letters with at least one black square.
+
+        for i, (letter, square) in enumerate(zip(guess, squares)):
+            position = self.at[i].get(letter, 0)
+            if square == feedback.GREEN:
+                mask &= position
+                marked[letter] += 1
+            else:
+                mask &= ~position
+                if square == feedback.YELLOW:
+                    marked[letter] += 1
+                else:
+                    blacked.add(letter)
+
+        # Each letter shows up at least as many times as it was marked, and exactly that many times if one of its
+        # copies was black.
+        for letter in set(guess):
+            masks = self.at_least.get(letter, [self.all])
+            copies = marked[letter]
+            mask &= masks[copies] if copies < len(masks) else 0
+            if letter in blacked and copies + 1 < len(masks):
+                mask &= ~masks[copies + 1]
+        return mask
+
+    # Returns the answers whose bits are set in the bitset.
+    def words(self, candidates):
+        words = []
+        while candidates:
+            low = candidates & -candidates
+            words.append(self.answers[low.bit_length() - 1])
+            candidates ^= low
+        return words
+
+
+# The feedback matrix used by best_guess in the worker process, kept between calls so it is only mapped once.
+_matrix = None
+
+
+# Returns the guess from the pool with the highest expected information (the entropy of how it would split the
+# candidate answers by feedback pattern), along with that entropy in bits. Candidates that could be the answer win ties.
+# This is a plain function so that it can be run in a separate process. If matrix_args (the matrix path, its answers,
+# guesses, and fingerprint) is given, guesses are scored from the feedback matrix.
+def best_guess(candidates, pool, matrix_args=None):
+    global _matrix
+    score = feedback.score_guess
+    if matrix_args is not None:
+        path, answers, guesses, source_fingerprint = matrix_args
+        if _matrix is None or _matrix.path != path:
+            _matrix = feedback.FeedbackMatrix(path, answers, guesses)
+            _matrix.open(source_fingerprint)
+        score = _matrix.score
+
+    if len(candidates) == 1:
+        return candidates[0], 0.0
+
+    possible = set(candidates)
+    best, best_key = None, None
+    for guess in pool:
+        groups = Counter(score(answer, guess) for answer in candidates)
+        total = len(candidates)
+        entropy = -sum(size / total * math.log2(size / total) for size in groups.values())
+        key = (entropy, guess in possible)
+        if best_key is None or key > best_key:
+            best, best_key = guess, key
+    return best, best_key[0]
+
+
+# Picks the guesses to consider and the candidates to score them against, sampling both down to the given sizes so the
+# search takes a bounded amount of time. The candidates themselves are always considered first.
+def search_space(candidates, guesses, pool_size, sample_size, seed=0):
+    rng = random.Random(seed)
+    sample = candidates if len(candidates) <= sample_size else rng.sample(candidates, sample_size)
+    pool = list(candidates[:pool_size])
+    if len(pool) < pool_size:
+        pool += rng.sample(guesses, min(len(guesses), pool_size - len(pool)))
+    return sample, pool
@@ -0,0 +1,89 @@
+# Author: Alec Creasy
+# File Name: sqlite_store.py
+# Description: The shared base for the bot's SQLite backed stores. Every database call runs on a single background
+# thread so the event loop never blocks on disk I/O, and changes are written behind: they are queued, and every change
+# within a short window is written in one transaction.
+
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SQLiteStore:
+    # path is the database file, flush_delay is how long (in seconds) to wait for more changes before writing, and
+    # checkpoint_every is how many writes to make before compacting the write-ahead log back into the database file.
+    def __init__(self, path, flush_delay=0.5, checkpoint_every=100):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.checkpoint_every = checkpoint_every
+        self.flush_task = None
+        self.writes_since_checkpoint = 0
+        self.connection = None
+
+        # Every database call runs on this single thread, so the connection is never used by two threads at once.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+
+    # Opens (or creates) the database in WAL mode and creates the store's tables. This runs once at startup, before the
+    # bot starts handling commands, so it is done synchronously. When the bot runs as several worker processes, they
+    # share the database, so a write waits (up to 5 seconds) for another process's write to finish instead of failing.
+    def connect(self, schema):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=FULL")
+        self.connection.execute("PRAGMA busy_timeout=5000")
+        self.connection.executescript(schema)
+        self.connection.commit()
+
+    # Runs the function with the given arguments on the store's thread and returns its result.
+    async def run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    # Schedules a flush after flush_delay seconds, unless one is already scheduled. Subclasses call this whenever they
+    # queue a change.
+    def schedule_flush(self):
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    # Writes every queued change. Subclasses take their queued changes and pass them to write().
+    async def flush(self):
+        raise NotImplementedError
+
+    # Runs the function (which makes the writes) in a single transaction on the store's thread, so the whole batch is
+    # committed with one fsync. Once enough writes have been made, the write-ahead log is checkpointed and truncated so
+    # it does not keep growing.
+    async def write(self, function, *args):
+        await self.run(self._write, function, args)
+
+    def _write(self, function, args):
+        with self.connection:
+            function(*args)
+
+        self.writes_since_checkpoint += 1
+        if self.writes_since_checkpoint >= self.checkpoint_every:
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.writes_since_checkpoint = 0
+
+    # Writes any queued changes and closes the database.
+    async def close(self):
+        if self.flush_task and not self.flush_task.done():
+            self.flush_task.cancel()
+        await self.flush()
+
+        await self.run(self._close)
+        self.executor.shutdown(wait=False)
+
+    def _close(self):
+        if self.connection is not None:
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,104 @@
+# Author: Alec Creasy
+# File Name: stores.py
+# Description: The interfaces of the stores that keep the bot's state (quotes, leaderboards, and running Wordle games),
+# and the backends that implement them. The cogs only use the methods defined here, and create their stores with
+# create(), so the backend can be swapped by setting STORE_BACKEND in the [Bot] section of config.ini. The only backend
+# is SQLite (shared by every worker process on the machine), and another backend is added by implementing the three
+# interfaces and listing its classes in BACKENDS.
+
+import importlib
+
+
+# Keeps the saved quotes. Quotes are dictionaries with submitter_id, author, and quote keys.
+class QuoteStorage:
+    # Opens the store and returns every saved quote, in the order they were added.
+    def open(self):
+        raise NotImplementedError
+
+    # Returns the quotes that other processes added since the store was last read, in the order they were added.
+    async def refresh(self):
+        raise NotImplementedError
+
+    # Saves a new quote. This should return right away, leaving the write to happen in the background.
+    def add(self, quote):
+        raise NotImplementedError
+
+    # Writes anything that has not been saved yet and closes the store.
+    async def close(self):
+        raise NotImplementedError
+
+
+# Keeps each server's Wordle leaderboard (a core.leaderboard.Leaderboard) and the time of the last weekly reset (as a
+# Unix timestamp in last_reset, or None if there has never been one).
+class LeaderboardStorage:
+    last_reset = None
+
+    # Opens the store and loads the leaderboards.
+    def open(self):
+        raise NotImplementedError
+
+    # Returns the leaderboard for the given server, creating an empty one if it does not have one yet.
+    def get(self, guild_id):
+        raise NotImplementedError
+
+    # Adds points to a user's score in the given server. This should return right away, leaving the write to happen
+    # in the background.
+    def add(self, guild_id, user_id, points):
+        raise NotImplementedError
+
+    # Archives every leaderboard under the time of the reset (a Unix timestamp) and clears the scores.
+    async def reset(self, when):
+        raise NotImplementedError
+
+    # Writes anything that has not been saved yet and closes the store.
+    async def close(self):
+        raise NotImplementedError
+
+
+# Keeps the running Wordle games so that they can be restored after a restart. Games are saved as snapshots in the
+# format used by GameInstance.snapshot, by the ID of the channel (or thread) they run in.
+class GameStorage:
+    # Opens the store and returns the snapshot of every saved game, by channel ID.
+    def open(self):
+        raise NotImplementedError
+
+    # Saves a new game in the given server.
+    def start(self, channel_id, guild_id, snapshot):
+        raise NotImplementedError
+
+    # Saves a guess: the attempt (the guesser's mention, the guess, and the rendered row) and the points that are still
+    # available.
+    def guess(self, channel_id, number, attempt, points_available):
+        raise NotImplementedError
+
+    # Removes a finished game.
+    def end(self, channel_id):
+        raise NotImplementedError
+
+    # Writes anything that has not been saved yet and closes the store.
+    async def close(self):
+        raise NotImplementedError
+
+
+# Backend name -> the class that implements each kind of store, as "module.Class". The classes are imported when a
+# store is created, since they import the interfaces from this module.
+BACKENDS = {
+    "sqlite": {
+        "quotes": "core.quote_store.QuoteStore",
+        "leaderboard": "core.leaderboard.LeaderboardStore",
+        "games": "core.game_store.GameStore",
+    },
+}
+
+
+# Creates the given kind of store ("quotes", "leaderboard", or "games") with the given backend. The options are passed
+# to the backend's class (for SQLite, the database path, the flush delay, and so on). Raises ValueError if the backend
+# does not exist.
+def create(backend, kind, *args, **options):
+    classes = BACKENDS.get(backend)
+    if classes is None:
+        raise ValueError(f"Unknown store backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+    module_name, class_name = classes[kind].rsplit(".", 1)
+    store_class = getattr(importlib.import_module(module_name), class_name)
+    return store_class(*args, **options)
@@ -0,0 +1,95 @@
+# Author: Alec Creasy
+# File Name: user_cache.py
+# Description: Resolves user IDs to users while avoiding REST calls. The bot's gateway cache is checked first, then a
+# bounded cache of users that were fetched recently (least recently used users are evicted first, and entries expire
+# after a time limit), and only then is the user fetched from Discord.
+
+import asyncio
+import discord
+from collections import OrderedDict
+from time import monotonic
+
+
+class UserCache:
+    # max_size is the most users that will be kept in the cache, and ttl is how long (in seconds) a fetched user is
+    # kept before it is fetched again (so name and avatar changes are eventually picked up).
+    def __init__(self, bot, max_size=1024, ttl=3600):
+        self.bot = bot
+        self.max_size = max_size
+        self.ttl = ttl
+        self.users = OrderedDict()  # User ID -> (user, expiry time), least recently used first.
+        self.warm_tasks = set()
+        self.gateway_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+
+    # Returns the user with the given ID, only fetching it from Discord if it is not in either cache. Raises the same
+    # exceptions as bot.fetch_user (for example, NotFound if the user no longer exists).
+    async def get(self, user_id):
+        user = self.get_cached(user_id)
+        if user is not None:
+            return user
+
+        self.misses += 1
+        user = await self.bot.fetch_user(user_id)
+        self.put(user)
+        return user
+
+    # Returns the user with the given ID if it is in either cache, or None.
+    def get_cached(self, user_id):
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.gateway_hits += 1
+            return user
+
+        entry = self.users.get(user_id)
+        if entry is not None:
+            user, expires = entry
+            if expires > monotonic():
+                self.users.move_to_end(user_id)
+                self.cache_hits += 1
+                return user
+            del self.users[user_id]
+
+        return None
+
+    # Adds a user to the cache (for example, the user who ran a command), evicting the least recently used user if the
+    # cache is full.
+    def put(self, user):
+        self.users[user.id] = (user, monotonic() + self.ttl)
+        self.users.move_to_end(user.id)
+        while len(self.users) > self.max_size:
+            self.users.popitem(last=False)
+
+    # Fetches the given users in the background so that later lookups do not have to wait on Discord. This waits until
+    # the bot has connected, since the gateway's member cache is empty before then and supplies most users for free.
+    # Users that are already cached are skipped, and failed fetches are ignored.
+    def warm(self, user_ids):
+        ready = self.bot.is_ready()
+        missing = [user_id for user_id in dict.fromkeys(user_ids)
+                   if user_id not in self.users and not (ready and self.bot.get_user(user_id) is not None)]
+        if not missing:
+            return
+
+        task = asyncio.create_task(self._warm(missing))
+        self.warm_tasks.add(task)
+        task.add_done_callback(self.warm_tasks.discard)
+
+    async def _warm(self, user_ids):
+        await self.bot.wait_until_ready()
+        for user_id in user_ids:
+            if self.bot.get_user(user_id) is not None or user_id in self.users:
+                continue
+            try:
+                self.put(await self.bot.fetch_user(user_id))
+            except discord.HTTPException:
+                pass
+
+    # Returns the hit and miss counters.
+    def stats(self):
+        return {
+            "size": len(self.users),
+            "gateway_hits": self.gateway_hits,
+            "cache_hits": self.cache_hits,
+            "misses": self.misses,
+        }
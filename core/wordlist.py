@@ -0,0 +1,102 @@
+# Author: Alec Creasy
+# File Name: wordlist.py
+# Description: Loads the Wordle word lists into a hash set index for fast guess validation, and handles the compact
+# binary word list format so that the lists can be loaded with a single read instead of parsing the text files.
+
+import hashlib
+import os
+import struct
+import zlib
+
+# The binary word list file starts with a header of the magic bytes, the format version, the word length, the number
+# of answers, the number of extra valid guesses (words that are valid but are not answers), a fingerprint of the text
+# files it was built from, and a CRC32 checksum of the records. The records are fixed length ASCII words with no
+# separators: the answers first, followed by the extra valid guesses, both in the order they appear in the text files.
+MAGIC = b"WLST"
+VERSION = 1
+HEADER = struct.Struct("<4sHBII32sI")
+
+
+# Builds a fingerprint of the word list files from their names, sizes, and modification times. This is cheap to
+# compute (no file reads), and changes whenever either word list is edited.
+def fingerprint(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.digest()
+
+
+# An index over a set of Wordle words. The answers and the guesses keep their word list order (the feedback matrix
+# relies on it), and the valid set gives constant time lookups when checking guesses.
+class WordIndex:
+    def __init__(self, answers, valid):
+        self.answers = tuple(answers)
+        self.guesses = tuple(dict.fromkeys(self.answers + tuple(valid)))
+        self.valid = frozenset(self.guesses)
+        self.length = len(self.answers[0]) if self.answers else 5
+
+    def __contains__(self, word):
+        return word in self.valid
+
+    def __len__(self):
+        return len(self.guesses)
+
+    # Packs the index into the binary word list format.
+    def pack(self, source_fingerprint=bytes(32)):
+        extra = self.guesses[len(self.answers):]
+        records = "".join(self.answers + extra).encode("ascii")
+        header = HEADER.pack(MAGIC, VERSION, self.length, len(self.answers), len(extra), source_fingerprint,
+                             zlib.crc32(records))
+        return header + records
+
+    # Unpacks an index from the binary word list format. Returns None if the data is not a valid word list, does not
+    # match the expected fingerprint (if one is given), or fails its checksum.
+    @classmethod
+    def unpack(cls, data, source_fingerprint=None):
+        if len(data) < HEADER.size:
+            return None
+
+        magic, version, length, num_answers, num_extra, stored_fingerprint, checksum = HEADER.unpack_from(data)
+        records = data[HEADER.size:]
+        if (magic != MAGIC or version != VERSION or len(records) != length * (num_answers + num_extra)
+                or zlib.crc32(records) != checksum):
+            return None
+        if source_fingerprint is not None and stored_fingerprint != source_fingerprint:
+            return None
+
+        text = records.decode("ascii")
+        words = [text[i:i + length] for i in range(0, len(text), length)]
+        return cls(words[:num_answers], words[num_answers:])
+
+
+# Reads the words of a text word list, one per line, skipping blank lines.
+def read_words(path):
+    with open(path) as file:
+        return [word for word in (line.strip().lower() for line in file) if word]
+
+
+# Loads the word index from the answer and valid text files. If a cache file is given, the index is loaded from it
+# with a single read when it is up to date with the text files, otherwise the text files are parsed and the cache file
+# is (re)written for next time.
+def load(answer_file, valid_file, cache_file=None):
+    source_fingerprint = fingerprint(answer_file, valid_file)
+
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, "rb") as file:
+            index = WordIndex.unpack(file.read(), source_fingerprint)
+        if index is not None:
+            return index
+
+    index = WordIndex(read_words(answer_file), read_words(valid_file))
+
+    if cache_file:
+        try:
+            temp_path = f"{cache_file}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(index.pack(source_fingerprint))
+            os.replace(temp_path, cache_file)
+        except OSError as error:
+            print(f"Could not write word list cache {cache_file}: {error}")
+
+    return index